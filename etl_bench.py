@@ -0,0 +1,222 @@
+# --- BENCHMARK PER TAHAP (TANPA STREAMLIT) ---
+# Mengukur waktu tiap tahap pipeline simple_etl.py di data sintetis
+# (etl_synth.py) untuk beberapa ukuran: baca CSV/Parquet, konversi
+# pandas <-> Spark, dedup, join, to_sql ke SQLite lokal, dan tulis Parquet.
+# Tiap tahap dijalankan beberapa kali (setelah warmup), yang dicatat waktu
+# tercepat. Hasil disimpan sebagai JSON; --compare menandai tahap yang melambat.
+#
+#   python etl_bench.py --rows 10000 100000 1000000 --repeat 5 --compare bench_results/lama.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+import psutil
+import pyarrow as pa
+
+from etl_db import make_engine
+from etl_extract import stream_csv_to_parquet
+from etl_load import push_table, write_parquet_file, write_spark
+from etl_spark import build_spark, to_spark, tune_spark
+from etl_synth import write_dataset
+from etl_transform import DUP_COUNT_COL, dedup_pandas, dedup_spark, join_pandas, join_spark
+
+BENCH_DIR = "bench_results"
+# Tahap yang lebih lambat dari ini (dibanding hasil lama) ditandai regresi,
+# asal selisihnya juga di atas batas absolut (tahap milidetik sangat berisik)
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.05
+# Jumlah eksekusi terukur & warmup (tidak diukur) per tahap
+BENCH_REPEATS = int(os.environ.get("ETL_BENCH_REPEATS", "3"))
+BENCH_WARMUP = int(os.environ.get("ETL_BENCH_WARMUP", "1"))
+# Tahap pandas dilewati jika data diperkirakan melebihi porsi RAM ini
+PANDAS_RAM_FRACTION = 0.5
+
+
+def _rss_mb():
+    return psutil.Process().memory_info().rss / 1024 ** 2
+
+
+class Bench:
+    def __init__(self, log=print, repeat=BENCH_REPEATS, warmup=BENCH_WARMUP):
+        self.results = []
+        self.log = log
+        self.repeat = max(1, repeat)
+        self.warmup = max(0, warmup)
+
+    def time(self, rows, stage, engine, fn, once=False):
+        # Jalankan fn() warmup + repeat kali; seconds = waktu tercepat, median
+        # & semua run ikut dicatat. once=True untuk tahap yang tidak bisa diulang
+        # (generate data, start Spark). Error dicatat, tidak menghentikan benchmark.
+        entry = {"rows": rows, "stage": stage, "engine": engine}
+        runs = []
+        try:
+            for i in range(1 if once else self.warmup + self.repeat):
+                start = time.perf_counter()
+                out = fn()
+                if once or i >= self.warmup:
+                    runs.append(time.perf_counter() - start)
+            entry["seconds"] = round(min(runs), 4)
+            entry["median"] = round(statistics.median(runs), 4)
+            entry["runs"] = [round(r, 4) for r in runs]
+            if isinstance(out, int):
+                entry["rows_out"] = out
+            elif isinstance(out, pd.DataFrame):
+                entry["rows_out"] = len(out)
+        except Exception as e:
+            out = None
+            entry["error"] = f"{type(e).__name__}: {e}"
+        entry["rss_mb"] = round(_rss_mb(), 1)
+        self.results.append(entry)
+        status = f"{entry['seconds']:.3f} s" if "seconds" in entry else f"GAGAL ({entry['error']})"
+        self.log(f"{rows:>11,} | {stage:<16} | {engine:<6} | {status}")
+        return out
+
+    def skip(self, rows, stage, engine, reason):
+        self.results.append({"rows": rows, "stage": stage, "engine": engine, "skipped": reason})
+        self.log(f"{rows:>11,} | {stage:<16} | {engine:<6} | dilewati ({reason})")
+
+
+def _stream_csv(src, dst):
+    with open(src, "rb") as f:
+        return stream_csv_to_parquet(f, dst)[0]
+
+
+def _write_parquet(df, path):
+    write_parquet_file(df, path)
+    return len(df)
+
+
+def _spark_noop(sdf):
+    # Paksa seluruh plan dieksekusi tanpa menulis output (format "noop")
+    sdf.write.format("noop").mode("overwrite").save()
+
+
+def bench_size(bench, rows, workdir, n_products, use_spark, spark_holder):
+    data_dir = os.path.join(workdir, f"data_{rows}")
+    paths = bench.time(rows, "generate", "numpy", lambda: write_dataset(data_dir, rows, n_products), once=True)
+    if paths is None:
+        return
+    sales_csv, sales_pq = paths["sales"]["csv"], paths["sales"]["parquet"]
+    products_pq = paths["products"]["parquet"]
+    products = pd.read_parquet(products_pq)
+
+    # --- pandas (jalur default halaman Streamlit) ---
+    sales = None
+    est_bytes = os.path.getsize(sales_csv) * 3
+    if est_bytes > psutil.virtual_memory().available * PANDAS_RAM_FRACTION:
+        for stage in ["read_csv", "read_parquet", "dedup", "join", "to_sql", "write_parquet"]:
+            bench.skip(rows, stage, "pandas", "RAM tidak cukup")
+    else:
+        bench.time(rows, "read_csv", "pandas", lambda: pd.read_csv(sales_csv))
+        sales = bench.time(rows, "read_parquet", "pandas", lambda: pd.read_parquet(sales_pq))
+    bench.time(rows, "read_csv_stream", "arrow",
+               lambda: _stream_csv(sales_csv, os.path.join(data_dir, "stream.parquet")))
+    if sales is not None:
+        bench.time(rows, "dedup", "pandas", lambda: dedup_pandas(sales)[0])
+        bench.time(rows, "join", "pandas", lambda: join_pandas(sales, products, "Product_ID", "Product_ID", "left"))
+        engine = make_engine(f"sqlite:///{os.path.join(data_dir, 'bench.db')}")
+        bench.time(rows, "to_sql", "sqlite", lambda: push_table(engine, sales, "penjualan", "replace")["rows"])
+        engine.dispose()
+        bench.time(rows, "write_parquet", "pandas", lambda: _write_parquet(sales, os.path.join(data_dir, "out.parquet")))
+
+    if not use_spark:
+        return
+    # --- Spark ---
+    if spark_holder.get("spark") is None:
+        spark_holder["spark"] = bench.time(rows, "spark_start", "spark", lambda: build_spark(None), once=True)
+        if spark_holder["spark"] is None:
+            return
+    spark = spark_holder["spark"]
+    tune_spark(spark, os.path.getsize(sales_pq) * 4)
+    bench.time(rows, "read_csv", "spark",
+               lambda: _spark_noop(spark.read.csv(sales_csv, header=True, inferSchema=True)))
+    sdf = spark.read.parquet(sales_pq)
+    bench.time(rows, "read_parquet", "spark", lambda: _spark_noop(sdf))
+    if sales is not None:
+        converted = bench.time(rows, "pandas_to_spark", "spark", lambda: to_spark(spark, sales)[0].cache(), once=True)
+        if converted is not None:
+            bench.time(rows, "spark_to_pandas", "spark", lambda: converted.toPandas())
+            converted.unpersist()
+    bench.time(rows, "dedup", "spark", lambda: _spark_noop(dedup_spark(sdf).drop(DUP_COUNT_COL)))
+    right = spark.read.parquet(products_pq)
+    bench.time(rows, "join", "spark",
+               lambda: _spark_noop(join_spark(sdf, right, "Product_ID", "Product_ID", "left", broadcast_right=True)))
+    out = os.path.join(data_dir, "spark_out")
+    bench.time(rows, "write_parquet", "spark",
+               lambda: write_spark(sdf, "file://" + os.path.abspath(out), "parquet", "snappy",
+                                   nbytes=os.path.getsize(sales_pq) * 4))
+
+
+def compare(results, previous_path, log=print):
+    # Bandingkan dengan file hasil sebelumnya: rasio waktu tercepat per (rows, stage, engine)
+    with open(previous_path, encoding="utf-8") as f:
+        old = {(r["rows"], r["stage"], r["engine"]): r.get("seconds") for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        before = old.get((r["rows"], r["stage"], r["engine"]))
+        if not before or "seconds" not in r:
+            continue
+        ratio = r["seconds"] / before
+        r["vs_previous"] = round(ratio, 3)
+        if ratio > REGRESSION_RATIO and r["seconds"] - before > REGRESSION_MIN_SECONDS:
+            regressions.append(r)
+            log(f"REGRESI {r['rows']:,} {r['stage']} ({r['engine']}): {before:.3f} s -> {r['seconds']:.3f} s ({ratio:.2f}x)")
+    return regressions
+
+
+def environment():
+    info = {"time": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "ram_gb": round(psutil.virtual_memory().total / 1024 ** 3, 1),
+            "pandas": pd.__version__, "pyarrow": pa.__version__}
+    try:
+        import pyspark
+        info["pyspark"] = pyspark.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tiap tahap ETL di data sintetis.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="Ukuran data penjualan")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--no-spark", action="store_true", help="Hanya tahap pandas/Arrow")
+    parser.add_argument("--workdir", default=None, help="Folder data sementara (default: temp, dihapus)")
+    parser.add_argument("--out", default=None, help=f"File JSON hasil (default: {BENCH_DIR}/bench_<waktu>.json)")
+    parser.add_argument("--compare", default=None, help="File JSON hasil sebelumnya")
+    parser.add_argument("--repeat", type=int, default=BENCH_REPEATS, help="Eksekusi terukur per tahap")
+    parser.add_argument("--warmup", type=int, default=BENCH_WARMUP, help="Eksekusi warmup per tahap (tidak diukur)")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="etl_bench_")
+    bench, spark_holder = Bench(repeat=args.repeat, warmup=args.warmup), {}
+    try:
+        for rows in args.rows:
+            bench_size(bench, rows, workdir, args.products, not args.no_spark, spark_holder)
+    finally:
+        if spark_holder.get("spark") is not None:
+            spark_holder["spark"].stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = compare(bench.results, args.compare) if args.compare else []
+    out = args.out or os.path.join(BENCH_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": bench.results}, f, indent=2)
+    print(f"Hasil disimpan: {out}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+# --- HELPER DATABASE UNTUK simple_etl.py ---
+# Engine dengan connection pool, pembacaan per chunk, dan pembacaan paralel
+# per rentang nilai kolom (mirip partitionColumn/numPartitions di Spark JDBC).
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+from sqlalchemy import (Date, DateTime, Integer, MetaData, Numeric, String, Table, cast, create_engine, func,
+                        or_, select)
+from sqlalchemy.dialects.mysql import BINARY
+from sqlalchemy.engine import make_url
+
+DB_CHUNK_ROWS = int(os.environ.get("ETL_DB_CHUNK_ROWS", "50000"))
+DB_WORKERS = int(os.environ.get("ETL_DB_WORKERS", "4"))
+
+
+def mysql_dsn(user, password, host, dbname):
+    return f'mysql+mysqlconnector://{user}:{password}@{host}/{dbname}'
+
+
+def make_engine(dsn, workers=DB_WORKERS, local_infile=False):
+    # Pool cukup besar untuk semua query paralel; pre_ping buang koneksi mati.
+    # local_infile: izinkan LOAD DATA LOCAL INFILE (mysql-connector)
+    if make_url(dsn).get_backend_name() == "sqlite":
+        return create_engine(dsn)
+    connect_args = {"allow_local_infile": True} if local_infile else {}
+    return create_engine(dsn, pool_size=workers, max_overflow=workers,
+                         pool_pre_ping=True, pool_recycle=3600, connect_args=connect_args)
+
+
+def reflect_table(engine, name):
+    return Table(name, MetaData(), autoload_with=engine)
+
+
+def partition_predicates(column, lower, upper, num_partitions):
+    # Sama seperti Spark JDBC: rentang [lower, upper] dibagi rata, partisi
+    # pertama juga mengambil NULL, partisi terakhir tanpa batas atas.
+    if lower is None or upper is None or num_partitions <= 1 or lower == upper:
+        return [None]
+    is_date = hasattr(lower, "year")
+    lo = pd.Timestamp(lower).value if is_date else lower
+    hi = pd.Timestamp(upper).value if is_date else upper
+    stride = (hi - lo) / num_partitions
+    bounds = [lo + stride * i for i in range(1, num_partitions)]
+    if is_date:
+        bounds = [pd.Timestamp(int(b)).to_pydatetime() for b in bounds]
+    elif isinstance(lower, int):
+        bounds = sorted(set(int(b) for b in bounds))
+    preds = [or_(column < bounds[0], column.is_(None))]
+    preds += [(column >= a) & (column < b) for a, b in zip(bounds, bounds[1:])]
+    preds.append(column >= bounds[-1])
+    return preds
+
+
+def read_query(engine, query, chunksize=DB_CHUNK_ROWS):
+    # Hasilnya tetap satu DataFrame di RAM; None jika tidak ada baris.
+    # Driver dengan server-side cursor (mis. pymysql) dibaca per chunk supaya
+    # baris mentah di driver tidak menumpuk sekaligus. mysqlconnector & SQLite
+    # tidak mendukungnya (stream_results diabaikan, seluruh hasil di-fetch ke
+    # client), jadi dibaca sekali tanpa concat chunk. Memory dibatasi lewat
+    # partisi (load_tables) dan watermark (read_incremental), bukan chunk.
+    with engine.connect() as conn:
+        if not engine.dialect.supports_server_side_cursors:
+            df = pd.read_sql(query, conn)
+            return None if df.empty else df
+        conn = conn.execution_options(stream_results=True)
+        chunks = list(pd.read_sql(query, conn, chunksize=chunksize))
+    if not chunks:
+        return None
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def table_queries(engine, name, partition_column=None, num_partitions=1):
+    tbl = reflect_table(engine, name)
+    base = select(tbl)
+    if not partition_column or partition_column not in tbl.c:
+        return tbl, [base]
+    column = tbl.c[partition_column]
+    if not isinstance(column.type, (Integer, Numeric, Date, DateTime)):
+        raise ValueError(f"Kolom partisi '{partition_column}' di tabel {name} harus angka atau tanggal")
+    with engine.connect() as conn:
+        lower, upper = conn.execute(select(func.min(column), func.max(column))).one()
+    preds = partition_predicates(column, lower, upper, num_partitions)
+    return tbl, [base if p is None else base.where(p) for p in preds]
+
+
+def load_tables(engine, tables, partition_column=None, num_partitions=1,
+                chunksize=DB_CHUNK_ROWS, workers=DB_WORKERS):
+    # Semua (tabel, partisi) dibaca bersamaan di satu thread pool.
+    # Yield (tabel, df, error) setiap kali satu tabel selesai.
+    parts, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {}
+        for name in tables:
+            try:
+                tbl, queries = table_queries(engine, name, partition_column, num_partitions)
+            except Exception as e:
+                yield name, None, e
+                continue
+            parts[name] = [None] * len(queries)
+            for i, q in enumerate(queries):
+                pending[pool.submit(read_query, engine, q, chunksize)] = (name, i, tbl)
+        remaining = {name: len(p) for name, p in parts.items()}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, i, tbl = pending.pop(fut)
+                try:
+                    parts[name][i] = fut.result()
+                except Exception as e:
+                    errors.setdefault(name, e)
+                remaining[name] -= 1
+                if remaining[name]:
+                    continue
+                if name in errors:
+                    yield name, None, errors[name]
+                    continue
+                frames = [p for p in parts.pop(name) if p is not None]
+                if frames:
+                    yield name, pd.concat(frames, ignore_index=True), None
+                else:
+                    yield name, pd.DataFrame(columns=[c.name for c in tbl.columns]), None
+
+
+# --- EXTRACT INCREMENTAL (WATERMARK) ---
+def _to_python(value):
+    # Nilai max dari pandas/numpy -> tipe Python biasa untuk parameter SQL
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, "item") else value
+
+
+def watermark_of(df, watermark_column):
+    # dropna dulu: kolom tanggal dari SQL bertipe object, max() gagal jika ada NULL
+    values = df[watermark_column].dropna()
+    return _to_python(values.max()) if len(values) else None
+
+
+def _key_columns(tbl):
+    # Primary key tabel; tanpa primary key seluruh kolom jadi key baris
+    return [c.name for c in tbl.primary_key.columns] or [c.name for c in tbl.columns]
+
+
+def _row_keys(df, columns):
+    # NaN -> None supaya baris dengan nilai kosong tetap sama saat dibandingkan
+    keys = df[columns].astype(object)
+    keys = keys.where(keys.notna(), None)
+    return list(keys.itertuples(index=False, name=None))
+
+
+def _seen_at(df, watermark_column, value, key_columns):
+    return set(_row_keys(df[df[watermark_column] == value], key_columns))
+
+
+def watermark_state(engine, name, df, watermark_column):
+    # Return (watermark, seen): nilai tertinggi & key baris yang sudah diambil
+    # di nilai itu (untuk read_incremental)
+    value = watermark_of(df, watermark_column)
+    if value is None:
+        return None, set()
+    return value, _seen_at(df, watermark_column, value, _key_columns(reflect_table(engine, name)))
+
+
+def read_incremental(engine, name, watermark_column, last_value=None, seen=(), chunksize=DB_CHUNK_ROWS):
+    # Ambil baris dengan watermark_column >= last_value. Pakai >= (bukan >)
+    # karena watermark tanggal bisa punya baris baru di tanggal yang sama;
+    # baris di last_value yang sudah pernah diambil (seen, key dari primary key
+    # atau seluruh kolom) dibuang. Return (df_baru, watermark_baru, seen_baru).
+    tbl = reflect_table(engine, name)
+    if watermark_column not in tbl.c:
+        raise KeyError(f"Kolom watermark '{watermark_column}' tidak ada di tabel {name}")
+    query = select(tbl)
+    if last_value is not None:
+        query = query.where(tbl.c[watermark_column] >= last_value)
+    df = read_query(engine, query, chunksize)
+    key_columns = _key_columns(tbl)
+    if df is not None and seen:
+        boundary = df.index[df[watermark_column] == last_value]
+        old = [i for i, k in zip(boundary, _row_keys(df.loc[boundary], key_columns)) if k in seen]
+        df = df.drop(index=old).reset_index(drop=True)
+    if df is None or df.empty:
+        return None, last_value, seen
+    value = watermark_of(df, watermark_column)
+    new_seen = _seen_at(df, watermark_column, value, key_columns)
+    return df, value, (set(seen) | new_seen if value == last_value else new_seen)
+
+
+# --- PUSHDOWN FILTER & KOLOM KE SUMBER SQL ---
+def contains_sql(engine, column, value):
+    # Substring case-sensitive seperti contains pandas/Spark. LIKE di MySQL
+    # (collation default) & SQLite tidak membedakan huruf besar/kecil; INSTR
+    # case-sensitive di SQLite, di MySQL jika salah satu argumennya binary.
+    if not isinstance(column.type, String):
+        column = cast(column, String)
+    if engine.dialect.name == "mysql":
+        column = cast(column, BINARY())
+    return func.instr(column, value) > 0
+
+
+def read_pushdown(engine, name, columns=None, filters=(), chunksize=DB_CHUNK_ROWS):
+    # SELECT kolom_terpilih FROM tabel WHERE INSTR(kolom, 'nilai') > 0 AND ...
+    tbl = reflect_table(engine, name)
+    query = select(*[tbl.c[c] for c in columns]) if columns else select(tbl)
+    for c, value in filters:
+        query = query.where(contains_sql(engine, tbl.c[c], value))
+    df = read_query(engine, query, chunksize)
+    if df is None:
+        return pd.DataFrame(columns=list(columns) if columns else [c.name for c in tbl.columns])
+    return df
+
+
+# --- JDBC SPARK (RUNNER RECIPE MODE SPARK) ---
+JDBC_DRIVERS = {"mysql": "com.mysql.cj.jdbc.Driver", "sqlite": "org.sqlite.JDBC"}
+
+
+def jdbc_options(dsn):
+    # DSN SQLAlchemy -> (url JDBC, properties) untuk reader/writer JDBC Spark
+    url = make_url(dsn)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        jdbc = f"jdbc:sqlite:{url.database}"
+    elif backend == "mysql":
+        # rewriteBatchedStatements: batch INSERT dikirim sebagai multi-row insert
+        jdbc = f"jdbc:mysql://{url.host}:{url.port or 3306}/{url.database}?rewriteBatchedStatements=true"
+    else:
+        raise ValueError(f"JDBC belum didukung untuk database {backend}")
+    props = {"driver": JDBC_DRIVERS[backend]}
+    if url.username:
+        props["user"] = url.username
+    if url.password:
+        props["password"] = url.password
+    return jdbc, props
+
+
+def read_jdbc(spark, dsn, name, partition_column=None, num_partitions=1, chunksize=DB_CHUNK_ROWS):
+    # Dibaca executor Spark langsung dari database; partisi per rentang nilai
+    # partition_column (batas min/max diambil dulu lewat SQLAlchemy)
+    url, props = jdbc_options(dsn)
+    reader = (spark.read.format("jdbc").option("url", url).option("dbtable", name)
+              .option("fetchsize", chunksize).options(**props))
+    if partition_column and num_partitions > 1:
+        engine = make_engine(dsn)
+        tbl = reflect_table(engine, name)
+        if partition_column in tbl.c:
+            column = tbl.c[partition_column]
+            with engine.connect() as conn:
+                lower, upper = conn.execute(select(func.min(column), func.max(column))).one()
+            if lower is not None and upper is not None and lower != upper:
+                reader = (reader.option("partitionColumn", partition_column)
+                          .option("lowerBound", str(lower)).option("upperBound", str(upper))
+                          .option("numPartitions", num_partitions))
+        engine.dispose()
+    return reader.load()
@@ -0,0 +1,149 @@
+# --- MODE COMPACT: DTYPE HEMAT MEMORY ---
+# read_csv / read_excel / read_sql menghasilkan int64 / float64 / object.
+# Mode compact mengganti tipe kolom saat Extract:
+#   teks sedikit nilai unik (Region, Status)  -> category
+#   teks lain (ID, nama)                       -> string[pyarrow]
+#   bilangan bulat (termasuk float + null)     -> int8/16/32 (Int8.. jika ada null)
+#   teks tanggal (2024-01-31, 31/01/2024)      -> datetime64
+# Jenis tiap kolom disimpan (meta "dtypes" di DataStore) supaya bisa
+# dipasang lagi setelah data lewat Spark (category/string kembali jadi
+# object, Int dengan null jadi float64).
+
+import os
+import re
+import warnings
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Teks jadi category jika nilai unik <= rasio ini dari baris sampel
+COMPACT_CATEGORY_RATIO = float(os.environ.get("ETL_COMPACT_CATEGORY_RATIO", "0.5"))
+COMPACT_SAMPLE_ROWS = 10000
+# Tanggal seperti 05/01/2024 dibaca 5 Januari (format Indonesia)
+COMPACT_DAYFIRST = True
+ISO_DATE = re.compile(r"^\d{4}-\d{1,2}-\d{1,2}")
+# Jumlah nilai unik sampel yang ditebak formatnya (tebakan per nilai lambat)
+DATETIME_GUESS_VALUES = 20
+
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+
+def _is_text(s):
+    return s.dtype == object and pd.api.types.infer_dtype(s.iloc[:COMPACT_SAMPLE_ROWS], skipna=True) == "string"
+
+
+def _guess_format(value):
+    # ISO (2024-01-02) selalu tahun-bulan-tanggal; dayfirst hanya untuk
+    # format lain (05/01/2024). Dengan dayfirst=True pandas menebak %Y-%d-%m.
+    dayfirst = COMPACT_DAYFIRST and not ISO_DATE.match(value)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return guess_datetime_format(value, dayfirst=dayfirst)
+
+
+def _to_datetime(s):
+    # Format ditebak dari beberapa nilai sampel, harus sama semua, lalu dicek
+    # ke seluruh sampel dan seluruh kolom; None (tetap teks) jika format
+    # berbeda-beda (ambigu) atau ada nilai yang tidak cocok
+    values = s.dropna()
+    if values.empty:
+        return None
+    sample = values.iloc[:COMPACT_SAMPLE_ROWS]
+    probes = pd.unique(sample)
+    probes = probes[::max(1, len(probes) // DATETIME_GUESS_VALUES)][:DATETIME_GUESS_VALUES]
+    formats = {_guess_format(str(v)) for v in probes}
+    if len(formats) != 1 or None in formats:
+        return None
+    fmt = formats.pop()
+    if pd.to_datetime(sample, format=fmt, errors="coerce").isna().any():
+        return None
+    parsed = pd.to_datetime(s, format=fmt, errors="coerce")
+    return parsed if parsed.isna().sum() == s.isna().sum() else None
+
+
+def _to_int(s):
+    # Float boleh jika semua nilainya bulat (float64 karena ada null)
+    if pd.api.types.is_float_dtype(s):
+        values = s.dropna()
+        if values.empty or not (values % 1 == 0).all():
+            return None
+        s = s.astype("Int64")
+    if not pd.api.types.is_integer_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return None
+    return pd.to_numeric(s, downcast="integer")
+
+
+def _convert(s, kind):
+    if kind == "category":
+        return s.astype("category")
+    if kind == "string":
+        return s.astype(ARROW_STRING)
+    if kind == "int":
+        return _to_int(s)
+    if kind == "datetime":
+        return _to_datetime(s)
+    return None
+
+
+def infer_kind(s):
+    # Jenis compact untuk satu kolom, None jika dibiarkan
+    if pd.api.types.is_numeric_dtype(s):
+        return "int" if _to_int(s) is not None else None
+    if not _is_text(s):
+        return None
+    if _to_datetime(s.iloc[:COMPACT_SAMPLE_ROWS]) is not None:
+        return "datetime"
+    sample = s.iloc[:COMPACT_SAMPLE_ROWS]
+    if sample.nunique(dropna=True) <= COMPACT_CATEGORY_RATIO * sample.count():
+        return "category"
+    return "string"
+
+
+def _label(dtype):
+    return "string[pyarrow]" if dtype == ARROW_STRING else str(dtype)
+
+
+def memory_mb(df):
+    return round(float(df.memory_usage(index=True, deep=True).sum()) / 1024 ** 2, 2)
+
+
+def compact_frame(df):
+    # Return (df_compact, kinds, report). kinds: {kolom: jenis} untuk
+    # restore_dtypes; report: memory sebelum/sesudah & perubahan tipe per kolom
+    before = memory_mb(df)
+    out, kinds, changes = {}, {}, {}
+    for c in df.columns:
+        s = df[c]
+        kind = infer_kind(s)
+        converted = _convert(s, kind) if kind else None
+        if converted is None or converted.dtype == s.dtype:
+            out[c] = s
+            continue
+        out[c] = converted
+        kinds[c] = kind
+        changes[c] = f"{_label(s.dtype)} -> {_label(converted.dtype)}"
+    result = pd.DataFrame(out, index=df.index)
+    report = {"before_mb": before, "after_mb": memory_mb(result), "columns": changes}
+    return result, kinds, report
+
+
+def restore_dtypes(df, kinds):
+    # Pasang lagi tipe compact pada kolom yang kehilangan tipenya. Kolom
+    # yang tipenya sengaja diganti (mis. Cast ke String/Float) dibiarkan.
+    fixed = None
+    for c, kind in kinds.items():
+        if c not in df.columns:
+            continue
+        s = df[c]
+        lost = ((kind in ("category", "string") and s.dtype == object)
+                or (kind == "int" and s.dtype in ("int64", "float64")))
+        if not lost:
+            continue
+        try:
+            converted = _convert(s, kind)
+        except (TypeError, ValueError):
+            converted = None
+        if converted is not None:
+            fixed = df.copy(deep=False) if fixed is None else fixed
+            fixed[c] = converted
+    return df if fixed is None else fixed
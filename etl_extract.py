@@ -0,0 +1,272 @@
+# --- HELPER EXTRACT UNTUK simple_etl.py ---
+# Parsing upload secara paralel, dan membaca file besar secara bertahap
+# (per blok) langsung ke dataset Parquet di disk, tanpa pernah membentuk
+# satu DataFrame pandas raksasa.
+
+import errno
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from etl_dtypes import compact_frame
+from etl_store import frame_bytes
+
+CSV_BLOCK_BYTES = 16 * 1024 ** 2
+# CSV di atas ukuran ini otomatis di-stream ke disk
+STREAM_CSV_MIN_MB = int(os.environ.get("ETL_STREAM_CSV_MIN_MB", "100"))
+
+# Jumlah worker parsing paralel (default: jumlah core)
+PARSE_WORKERS = int(os.environ.get("ETL_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Batas ukuran cache hasil parsing (dipakai bersama semua sesi)
+PARSE_CACHE_MB = int(os.environ.get("ETL_PARSE_CACHE_MB", "512"))
+
+_BAD_COLUMN = re.compile(r"In CSV column #(\d+)")
+
+
+def _file_size(fileobj):
+    pos = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(pos)
+    return size
+
+
+def stream_csv_to_parquet(fileobj, path, progress=None):
+    # Tipe kolom ditebak dari blok pertama. Jika blok berikutnya tidak cocok,
+    # tipe kolom itu diperlebar lalu pembacaan diulang: int / kolom kosong ->
+    # float64 (mis. ada desimal di blok belakang, seperti pd.read_csv), baru
+    # string jika masih gagal (berisi teks). Return (jumlah_baris,
+    # kolom_yang_dijadikan_string).
+    total = _file_size(fileobj) or 1
+    column_types = {}
+    while True:
+        fileobj.seek(0)
+        try:
+            rows = _write_batches(fileobj, path, total, column_types, progress)
+            return rows, [n for n, t in column_types.items() if t == pa.string()]
+        except pa.ArrowInvalid as e:
+            m = _BAD_COLUMN.search(str(e))
+            if not m:
+                raise
+            field = _csv_schema(fileobj).field(int(m.group(1)))
+            current = column_types.get(field.name, field.type)
+            if current == pa.string():
+                raise
+            widen = pa.types.is_integer(current) or pa.types.is_null(current)
+            column_types[field.name] = pa.float64() if widen else pa.string()
+
+
+def _csv_schema(fileobj):
+    # Schema tebakan dari blok pertama
+    fileobj.seek(0)
+    reader = pacsv.open_csv(fileobj, read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_BYTES))
+    return reader.schema
+
+
+def _write_batches(fileobj, path, total, column_types, progress):
+    reader = pacsv.open_csv(
+        fileobj,
+        read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        # strings_can_be_null: sel kosong jadi NaN seperti pd.read_csv
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    rows = 0
+    with pq.ParquetWriter(path, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            if progress:
+                progress(min(fileobj.tell() / total, 1.0))
+    return rows
+
+
+def scan_parquet(src, dst, columns=None, filters=()):
+    # Baca ulang Parquet hanya dengan kolom terpilih & baris yang cocok
+    # (contains), per batch langsung ditulis ke file baru di dst
+    dataset = ds.dataset(src, format="parquet")
+    expr = None
+    for c, value in filters:
+        cond = pc.match_substring(ds.field(c).cast(pa.string()), value)
+        expr = cond if expr is None else expr & cond
+    scanner = dataset.scanner(columns=columns or None, filter=expr)
+    rows = 0
+    with pq.ParquetWriter(dst, scanner.projected_schema) as writer:
+        for batch in scanner.to_batches():
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+# --- PARSING PARALEL ---
+def read_upload(name, fileobj):
+    if name.endswith('.csv'):
+        return pd.read_csv(fileobj)
+    elif name.endswith('.xlsx'):
+        return pd.read_excel(fileobj)
+    elif name.endswith('.parquet'):
+        return pd.read_parquet(fileobj)
+    raise ValueError(f"Format file tidak didukung: {name}")
+
+
+def with_compact(df, compact):
+    # Return (df, info_compact). Mode compact: dtype hemat memory (etl_dtypes),
+    # info berisi jenis kolom ("dtypes") & laporan memory sebelum/sesudah
+    if not compact:
+        return df, None
+    df, kinds, report = compact_frame(df)
+    return df, {"dtypes": kinds, **report}
+
+
+def _parse_upload(name, fileobj, compact):
+    return with_compact(read_upload(name, fileobj), compact)
+
+
+def _read_excel_bytes(raw, compact=False):
+    # Dijalankan di process pool: openpyxl murni Python, tidak paralel di thread
+    return with_compact(pd.read_excel(io.BytesIO(raw)), compact)
+
+
+def parse_parallel(tasks, on_tick=None, workers=PARSE_WORKERS, poll_seconds=0.2, compact=False):
+    # tasks: list (name, fileobj, stream_path). stream_path != None berarti
+    # CSV di-stream ke Parquet. Yield (name, df_atau_None, info, error) sesuai
+    # urutan selesai. on_tick(progress_dict) dipanggil dari thread pemanggil,
+    # jadi aman untuk update widget Streamlit. compact=True: DataFrame hasil
+    # parsing dikecilkan dtype-nya di worker, info["compact"] berisi laporannya.
+    if not tasks:
+        return
+    # Key diisi di depan: thread worker hanya mengganti nilai, ukuran dict
+    # tidak berubah saat on_tick membacanya
+    progress = {name: 0.0 for name, _, stream_path in tasks if stream_path}
+    excel = [t for t in tasks if t[0].endswith('.xlsx') and t[2] is None]
+    threads = ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks))))
+    procs = None
+    if len(excel) > 1:
+        procs = ProcessPoolExecutor(max_workers=max(1, min(workers, len(excel))),
+                                    mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pending = {}
+        for name, fileobj, stream_path in tasks:
+            if stream_path:
+                cb = lambda f, n=name: progress.__setitem__(n, f)
+                fut = threads.submit(stream_csv_to_parquet, fileobj, stream_path, cb)
+            elif procs and name.endswith('.xlsx'):
+                fut = procs.submit(_read_excel_bytes, fileobj.getvalue(), compact)
+            else:
+                fut = threads.submit(_parse_upload, name, fileobj, compact)
+            pending[fut] = (name, stream_path)
+        while pending:
+            done, _ = wait(pending, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+            if on_tick:
+                on_tick(dict(progress))
+            for fut in done:
+                name, stream_path = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    yield name, None, None, e
+                    continue
+                if stream_path:
+                    rows, as_str = result
+                    yield name, None, {"rows": rows, "as_string": as_str}, None
+                else:
+                    df, compacted = result
+                    info = {"rows": len(df)}
+                    if compacted:
+                        info["compact"] = compacted
+                    yield name, df, info, None
+    finally:
+        threads.shutdown(wait=False, cancel_futures=True)
+        if procs:
+            procs.shutdown(wait=False, cancel_futures=True)
+
+
+# --- CACHE HASIL PARSING (BERDASARKAN ISI FILE) ---
+def content_key(fileobj, name, streamed, compact=False):
+    # Hash isi file + opsi pembacaan; nama file tidak ikut, jadi file yang
+    # sama dengan nama lain tetap kena cache
+    h = hashlib.blake2b(digest_size=16)
+    with fileobj.getbuffer() as buf:
+        h.update(buf)
+    return (h.hexdigest(), os.path.splitext(name)[1].lower(), bool(streamed), bool(compact) and not streamed)
+
+
+def link_file(src, dst):
+    # Hard link jika bisa (tanpa copy), kalau beda filesystem (EXDEV) baru
+    # di-copy. dst selalu path baru atau nama dari hash isi: jika sudah ada,
+    # isinya sama dan bisa jadi ter-link ke store sesi lain, jadi tidak ditimpa.
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Copy ke file sementara lalu rename, supaya dst tidak pernah setengah jadi
+        tmp = f"{dst}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    return dst
+
+
+class ParseCache:
+    def __init__(self, max_mb=PARSE_CACHE_MB, cache_dir=None):
+        self.max_bytes = max_mb * 1024 ** 2
+        self.cache_dir = cache_dir or tempfile.mkdtemp(prefix="etl_parse_cache_")
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.cache_dir, True)
+        self._items = OrderedDict()  # key -> (jenis, df_atau_path, info, bytes), urutan LRU
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # Return (jenis, df_atau_path, info) atau None
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[:3]
+
+    def put_frame(self, key, df, info):
+        self._put(key, ("frame", df, info, frame_bytes(df)))
+
+    def put_file(self, key, path, info):
+        nbytes = os.path.getsize(path)
+        if nbytes > self.max_bytes:
+            return
+        cached = link_file(path, os.path.join(self.cache_dir, key[0] + ".parquet"))
+        self._put(key, ("file", cached, info, nbytes))
+
+    def _put(self, key, item):
+        if item[3] > self.max_bytes:
+            return
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while sum(i[3] for i in self._items.values()) > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                if old[0] == "file" and os.path.exists(old[1]):
+                    os.remove(old[1])
+
+    def stats(self):
+        with self._lock:
+            used = sum(i[3] for i in self._items.values())
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items), "MB": round(used / 1024 ** 2, 2)}
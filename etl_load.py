@@ -0,0 +1,225 @@
+# --- HELPER LOAD UNTUK simple_etl.py ---
+# Menulis hasil ETL ke database dengan batch multi-row insert (atau
+# LOAD DATA LOCAL INFILE untuk MySQL), beberapa koneksi paralel, dan mode
+# replace / append / upsert. Juga writer Parquet/ORC native Spark dan
+# export Parquet per row group untuk download.
+
+import csv
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import String, inspect, text
+from sqlalchemy.dialects import mysql, sqlite
+
+from etl_db import jdbc_options
+
+# chunk = satu transaksi per koneksi, batch = baris per statement INSERT
+LOAD_CHUNK_ROWS = int(os.environ.get("ETL_LOAD_CHUNK_ROWS", "50000"))
+LOAD_BATCH_ROWS = int(os.environ.get("ETL_LOAD_BATCH_ROWS", "1000"))
+LOAD_WORKERS = int(os.environ.get("ETL_LOAD_WORKERS", "4"))
+LOAD_MODES = ["replace", "append", "upsert"]
+
+
+def _upsert_method(key):
+    # Dipakai sebagai method= di DataFrame.to_sql: INSERT yang meng-update
+    # baris lama jika key sudah ada. Satu executemany per batch (chunksize
+    # to_sql), ditulis ulang driver MySQL jadi satu INSERT multi-row.
+    def method(pd_table, conn, keys, data_iter):
+        rows = [dict(zip(keys, row)) for row in data_iter]
+        if not rows:
+            return 0
+        dialect = conn.dialect.name
+        if dialect == "mysql":
+            stmt = mysql.insert(pd_table.table)
+            stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in keys if c != key})
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(pd_table.table)
+            stmt = stmt.on_conflict_do_update(index_elements=[key],
+                                              set_={c: stmt.excluded[c] for c in keys if c != key})
+        else:
+            raise ValueError(f"Upsert belum didukung untuk database {dialect}")
+        return conn.execute(stmt, rows).rowcount
+    return method
+
+
+def _has_unique_key(engine, table, key):
+    insp = inspect(engine)
+    if insp.get_pk_constraint(table).get("constrained_columns") == [key]:
+        return True
+    return any(ix.get("unique") and ix["column_names"] == [key] for ix in insp.get_indexes(table)) \
+        or any(uc["column_names"] == [key] for uc in insp.get_unique_constraints(table))
+
+
+def prepare_table(engine, df, table, mode, key=None):
+    # Buat / kosongkan tabel tujuan sesuai mode, sebelum data ditulis paralel
+    exists = inspect(engine).has_table(table)
+    if mode == "replace" or not exists:
+        # Kolom key non-angka (object, string[pyarrow], category) dibuat VARCHAR
+        # agar bisa diberi UNIQUE index (TEXT tidak bisa di MySQL)
+        text_key = key and not (pd.api.types.is_numeric_dtype(df[key]) or pd.api.types.is_datetime64_any_dtype(df[key]))
+        dtype = {key: String(255)} if text_key else None
+        df.head(0).to_sql(table, engine, if_exists="replace", index=False, dtype=dtype)
+        if mode == "upsert":
+            q = engine.dialect.identifier_preparer.quote
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE UNIQUE INDEX {q('ux_' + table + '_' + key)} ON {q(table)} ({q(key)})"))
+    elif mode == "upsert" and not _has_unique_key(engine, table, key):
+        raise ValueError(f"Tabel {table} belum punya PRIMARY KEY / UNIQUE index di kolom {key}, upsert tidak bisa dilakukan.")
+
+
+def _write_chunk_insert(engine, chunk, table, method, batch_rows):
+    # Satu executemany per batch_rows baris (chunksize to_sql), satu transaksi
+    # per chunk. mysqlconnector/pymysql menulis ulang executemany INSERT jadi
+    # INSERT ... VALUES (..), (..) berisi seluruh batch; SQLite menjalankan
+    # prepared statement per baris (lebih cepat dari VALUES multi-row yang
+    # di-compile ulang SQLAlchemy tiap batch).
+    with engine.begin() as conn:
+        chunk.to_sql(table, conn, if_exists="append", index=False, method=method, chunksize=batch_rows)
+    return len(chunk)
+
+
+def _escape_backslash(v):
+    return v.replace("\\", "\\\\") if isinstance(v, str) else v
+
+
+def _write_chunk_infile(engine, chunk, table, replace):
+    # LOAD DATA LOCAL INFILE dari CSV sementara (butuh local_infile=ON di server).
+    # Escape default MySQL (backslash): \N dibaca sebagai NULL, backslash di
+    # teks ditulis ganda supaya tidak dianggap escape.
+    chunk = chunk.copy()
+    for c in chunk.columns:
+        s = chunk[c]
+        if s.dtype == bool:
+            chunk[c] = s.astype(int)
+        elif not (pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s)):
+            chunk[c] = s.map(_escape_backslash, na_action="ignore")
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        chunk.to_csv(path, index=False, header=False, na_rep="\\N", quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+        cols = ", ".join(f"`{c}`" for c in chunk.columns)
+        sql = (f"LOAD DATA LOCAL INFILE '{path}' {'REPLACE' if replace else ''} INTO TABLE `{table}` "
+               "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+               f"LINES TERMINATED BY '\\n' ({cols})")
+        with engine.begin() as conn:
+            conn.execute(text(sql))
+    finally:
+        os.remove(path)
+    return len(chunk)
+
+
+def push_table(engine, df, table, mode="replace", key=None, chunk_rows=LOAD_CHUNK_ROWS,
+               batch_rows=LOAD_BATCH_ROWS, workers=LOAD_WORKERS, bulk_infile=False):
+    # Return dict statistik: baris, detik, baris/detik
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Mode tidak dikenal: {mode}")
+    if mode == "upsert" and key not in df.columns:
+        raise ValueError(f"Kolom key '{key}' tidak ada di data.")
+    if bulk_infile and engine.dialect.name != "mysql":
+        raise ValueError("LOAD DATA LOCAL INFILE hanya untuk MySQL.")
+    start = time.perf_counter()
+    prepare_table(engine, df, table, mode, key)
+    if mode == "upsert":
+        # Key ganda di chunk berbeda ditulis paralel tanpa urutan: cukup baris terakhir per key
+        df = df.drop_duplicates(subset=[key], keep="last")
+
+    chunks = [df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows)]
+    if bulk_infile:
+        write = lambda c: _write_chunk_infile(engine, c, table, replace=(mode == "upsert"))
+    else:
+        method = _upsert_method(key) if mode == "upsert" else None
+        write = lambda c: _write_chunk_insert(engine, c, table, method, batch_rows)
+
+    # SQLite hanya boleh satu penulis dalam satu waktu
+    n_workers = 1 if engine.dialect.name == "sqlite" else max(1, min(workers, len(chunks)))
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        rows = sum(pool.map(write, chunks))
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else float("inf")}
+
+
+# --- WRITER SPARK (HDFS / file://) ---
+SPARK_FORMATS = {
+    "parquet": ["snappy", "zstd", "gzip", "lz4", "none"],
+    "orc": ["snappy", "zstd", "zlib", "lz4", "none"],
+}
+
+
+def write_spark(sdf, url, fmt="parquet", compression="snappy", partition_by=(), mode="overwrite",
+                target_file_mb=128, nbytes=None, rows=None):
+    # DataFrame writer native Spark: kolom tetap bertipe, partitionBy jadi
+    # folder kolom=nilai. Ukuran file diatur lewat jumlah partisi output
+    # (perkiraan nbytes / target) dan maxRecordsPerFile.
+    partition_by = list(partition_by)
+    target = target_file_mb * 1024 ** 2
+    if nbytes:
+        n_files = max(1, math.ceil(nbytes / target))
+        sdf = sdf.repartition(n_files, *partition_by) if partition_by else sdf.repartition(n_files)
+    writer = sdf.write.mode(mode).format(fmt).option("compression", compression)
+    if nbytes and rows:
+        writer = writer.option("maxRecordsPerFile", max(1, int(rows * target / nbytes)))
+    if partition_by:
+        writer = writer.partitionBy(*partition_by)
+    writer.save(url)
+
+
+def write_jdbc(sdf, dsn, table, mode="replace", batch_rows=LOAD_BATCH_ROWS, workers=LOAD_WORKERS):
+    # Writer JDBC Spark: tiap partisi ditulis executor langsung ke database,
+    # maksimal `workers` koneksi bersamaan, batch_rows baris per batch INSERT
+    if mode not in ("replace", "append"):
+        raise ValueError(f"Mode {mode} tidak didukung writer JDBC Spark, pakai push_table.")
+    url, props = jdbc_options(dsn)
+    (sdf.write.format("jdbc").mode("overwrite" if mode == "replace" else "append")
+        .option("url", url).option("dbtable", table)
+        .option("batchsize", batch_rows).option("numPartitions", workers)
+        .options(**props).save())
+
+
+# --- EXPORT PARQUET KE FILE (UNTUK DOWNLOAD) ---
+PARQUET_CODECS = ["snappy", "zstd", "gzip", "none"]
+ROW_GROUP_ROWS = int(os.environ.get("ETL_ROW_GROUP_ROWS", "100000"))
+# st.download_button membaca seluruh file ke memory; file lebih besar
+# dari ini tidak ditawarkan lewat browser, cukup ditunjukkan path-nya
+DOWNLOAD_MAX_MB = int(os.environ.get("ETL_DOWNLOAD_MAX_MB", "500"))
+DICT_MAX_RATIO = 0.5
+
+
+def low_cardinality_columns(df, sample_rows=10000, max_ratio=DICT_MAX_RATIO):
+    # Kolom teks dengan sedikit nilai unik (Region, Status, ...) cocok
+    # untuk dictionary encoding; kolom category (mode compact) selalu
+    sample = df.iloc[:sample_rows]
+    if sample.empty:
+        return []
+    return [c for c in df.columns
+            if df[c].dtype.name == "category"
+            or (df[c].dtype == object and sample[c].nunique(dropna=True) <= max_ratio * len(sample))]
+
+
+def write_parquet_file(data, path, compression="snappy", row_group_rows=ROW_GROUP_ROWS, dictionary_cols=()):
+    # data: pandas DataFrame atau path Parquet di disk. Ditulis per row group,
+    # jadi yang ada di memory hanya satu row group Arrow dalam satu waktu.
+    codec = None if compression == "none" else compression
+    use_dictionary = list(dictionary_cols) if dictionary_cols else False
+    if isinstance(data, str):
+        source = pq.ParquetFile(data) if os.path.isfile(data) else None
+        dataset = None if source else ds.dataset(data, format="parquet")
+        schema = source.schema_arrow if source else dataset.schema
+        batches = source.iter_batches(batch_size=row_group_rows) if source else dataset.to_batches(batch_size=row_group_rows)
+        with pq.ParquetWriter(path, schema, compression=codec, use_dictionary=use_dictionary) as writer:
+            for batch in batches:
+                writer.write_batch(batch, row_group_size=row_group_rows)
+        return path
+    schema = pa.Schema.from_pandas(data, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression=codec, use_dictionary=use_dictionary) as writer:
+        for start in range(0, max(len(data), 1), row_group_rows):
+            part = data.iloc[start:start + row_group_rows]
+            writer.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False),
+                               row_group_size=row_group_rows)
+    return path
@@ -0,0 +1,153 @@
+# --- INSTRUMENTASI PER LANGKAH ETL ---
+# Setiap aksi Extract/Transform/Load dibungkus StepLog.step(): waktu total,
+# baris masuk/keluar, waktu konversi pandas <-> Spark vs sisanya, job Spark
+# yang dijalankan, byte yang lewat Arrow, dan RSS tertinggi selama langkah.
+
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import psutil
+
+RSS_SAMPLE_SECONDS = 0.05
+STEP_LOG_MAX = 500
+
+# Akumulator konversi per thread (tiap sesi Streamlit jalan di thread sendiri)
+_local = threading.local()
+
+
+def _counters():
+    if not hasattr(_local, "seconds"):
+        _local.seconds, _local.bytes = 0.0, 0
+    return _local
+
+
+@contextmanager
+def conversion():
+    # Bungkus perpindahan data pandas <-> Spark. Untuk toPandas waktu ini
+    # juga mencakup eksekusi plan Spark yang dipicu oleh collect.
+    # Yield dict; isi "bytes" dengan ukuran data yang dipindahkan.
+    info = {"bytes": 0}
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        c = _counters()
+        c.seconds += time.perf_counter() - start
+        c.bytes += info["bytes"]
+
+
+def active_spark_context():
+    # SparkContext yang sedang jalan, tanpa meng-import pyspark jika belum dipakai
+    if "pyspark" not in sys.modules:
+        return None
+    from pyspark import SparkContext
+    return SparkContext._active_spark_context
+
+
+class _RssSampler:
+    # RSS proses diambil berkala di thread terpisah; simpan nilai tertinggi
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.proc = psutil.Process()
+        self.peak = self.proc.memory_info().rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.proc.memory_info().rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.proc.memory_info().rss)
+
+
+def _rows(store, key):
+    if store is None or key is None or key not in store:
+        return None
+    return store.summary(key)["rows"]
+
+
+class StepLog:
+    def __init__(self, max_entries=STEP_LOG_MAX):
+        self.entries = []
+        self.max_entries = max_entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    @contextmanager
+    def step(self, stage, action, dataset=None, store=None):
+        # Yield dict langkah: handler boleh mengisi rows_out / dataset (hasil
+        # baru) / error / skip=True (tidak ada yang dikerjakan, tidak dicatat).
+        rec = {"time": datetime.now().isoformat(timespec="seconds"), "stage": stage,
+               "action": action, "dataset": dataset, "rows_in": _rows(store, dataset)}
+        c = _counters()
+        conv_seconds, conv_bytes = c.seconds, c.bytes
+        group = f"etl-{uuid.uuid4().hex[:12]}"
+        sc = active_spark_context()
+        ungrouped = set(sc.statusTracker().getJobIdsForGroup(None)) if sc else set()
+        if sc:
+            sc.setJobGroup(group, f"{stage}: {action}")
+        start = time.perf_counter()
+        try:
+            with _RssSampler() as rss:
+                yield rec
+            # Error yang ditangkap handler (st.error) dicatat lewat rec["error"]
+            rec["status"] = f"error: {rec.pop('error')}" if "error" in rec else "ok"
+        except Exception as e:
+            rec["status"] = f"error: {e}"
+            raise
+        except BaseException:
+            # st.rerun() / st.stop() (kontrol alur Streamlit), bukan error
+            rec["status"] = "ok"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            convert = c.seconds - conv_seconds
+            rec.update(seconds=round(seconds, 3), convert_seconds=round(convert, 3),
+                       compute_seconds=round(max(seconds - convert, 0.0), 3),
+                       arrow_mb=round((c.bytes - conv_bytes) / 1024 ** 2, 2),
+                       peak_rss_mb=round(rss.peak / 1024 ** 2, 1))
+            # Spark bisa saja baru dinyalakan di dalam langkah ini
+            sc = active_spark_context()
+            if sc:
+                tracker = sc.statusTracker()
+                jobs = set(tracker.getJobIdsForGroup(group)) | (set(tracker.getJobIdsForGroup(None)) - ungrouped)
+                infos = [tracker.getJobInfo(j) for j in jobs]
+                rec["spark_jobs"] = sorted(jobs)
+                rec["spark_stages"] = sum(len(i.stageIds) for i in infos if i)
+                sc.setLocalProperty("spark.jobGroup.id", None)
+            if "rows_out" not in rec and rec["status"] == "ok":
+                rec["rows_out"] = _rows(store, rec["dataset"])
+            if store is not None:
+                rec["store_ram_mb"] = round(store.resident_bytes() / 1024 ** 2, 1)
+            if not rec.pop("skip", False):
+                self.entries.append(rec)
+                del self.entries[:-self.max_entries]
+
+    def clear(self):
+        self.entries.clear()
+
+    def frame(self):
+        df = pd.DataFrame(self.entries)
+        if "spark_jobs" in df.columns:
+            df["spark_jobs"] = df["spark_jobs"].map(lambda j: ",".join(map(str, j)) if isinstance(j, list) else "")
+        return df
+
+    def to_csv(self):
+        return self.frame().to_csv(index=False)
+
+    def to_json(self):
+        return json.dumps(self.entries, indent=2, default=str)
@@ -0,0 +1,334 @@
+# --- RECIPE: REKAM & JALANKAN ULANG PIPELINE ETL ---
+# Setiap aksi Extract/Transform/Load di simple_etl.py dicatat sebagai satu
+# langkah recipe (JSON/YAML). Recipe bisa dijalankan ulang tanpa Streamlit:
+#
+#   python etl_recipe.py recipe.yaml --input-dir data/ --engine spark
+#
+# engine "auto" memilih pandas/Spark per operasi seperti halaman Transform,
+# engine "spark" memakai Spark dari baca sampai tulis (tanpa bolak-balik pandas).
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import yaml
+from sqlalchemy.engine import make_url
+
+from etl_db import DB_CHUNK_ROWS, load_tables, make_engine, read_jdbc, read_pushdown
+from etl_extract import read_upload, with_compact
+from etl_load import (LOAD_BATCH_ROWS, LOAD_CHUNK_ROWS, LOAD_WORKERS, ROW_GROUP_ROWS, push_table,
+                      write_jdbc, write_parquet_file, write_spark)
+from etl_spark import build_spark, estimate_bytes, is_spark, to_pandas, to_spark, tune_spark
+from etl_store import frame_bytes
+from etl_transform import (DUP_COUNT_COL, PANDAS_MAX_MB, bulk_replace_pandas, bulk_replace_spark, cast_spark,
+                           choose_engine, choose_join_strategy, column_kinds, dedup_pandas, dedup_spark,
+                           fill_blank_pandas, fill_blank_spark, filter_contains_pandas, filter_contains_spark,
+                           join_pandas, join_spark, merge_columns_pandas, merge_columns_spark, replace_pandas,
+                           replace_spark, split_pandas, split_spark, union_to_parquet)
+
+# Password tidak ikut disimpan di recipe; saat dijalankan diambil dari env ini
+PASSWORD_ENV = "ETL_DB_PASSWORD"
+ENGINES = ["auto", "spark"]
+
+EXTRACT_OPS = ["read_file", "read_table", "union"]
+TRANSFORM_OPS = ["fill", "dedup", "replace", "bulk_replace", "filter", "select", "transpose", "split", "merge", "cast", "join"]
+LOAD_OPS = ["to_parquet", "to_spark", "to_sql"]
+
+
+def mask_dsn(dsn):
+    return make_url(dsn).render_as_string(hide_password=True)
+
+
+def resolve_dsn(dsn):
+    url = make_url(dsn)
+    if url.password == "***":
+        url = url.set(password=os.environ.get(PASSWORD_ENV, ""))
+    return url.render_as_string(hide_password=False)
+
+
+class Recipe:
+    def __init__(self, steps=None):
+        self.steps = list(steps or [])
+
+    def __len__(self):
+        return len(self.steps)
+
+    def record(self, op, dataset=None, **params):
+        if op not in EXTRACT_OPS + TRANSFORM_OPS + LOAD_OPS:
+            raise ValueError(f"Operasi tidak dikenal: {op}")
+        if "dsn" in params:
+            params["dsn"] = mask_dsn(params["dsn"])
+        self.steps.append({"op": op, "dataset": dataset, **params})
+
+    def pop(self, dataset, op):
+        # Buang langkah terakhir op untuk dataset (dipakai Undo); return langkahnya atau None
+        for i in range(len(self.steps) - 1, -1, -1):
+            if self.steps[i]["dataset"] == dataset and self.steps[i]["op"] == op:
+                return self.steps.pop(i)
+        return None
+
+    def push(self, step):
+        # Pasang lagi langkah hasil pop() (Redo)
+        if step is not None:
+            self.steps.append(step)
+
+    def clear(self):
+        self.steps.clear()
+
+    def dumps(self, fmt="yaml"):
+        doc = {"version": 1, "steps": self.steps}
+        if fmt == "json":
+            return json.dumps(doc, indent=2, default=str)
+        return yaml.safe_dump(json.loads(json.dumps(doc, default=str)), sort_keys=False, allow_unicode=True)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+        return cls(doc.get("steps", []))
+
+
+# --- RUNNER ---
+class RecipeRunner:
+    def __init__(self, engine="auto", input_dir=".", log=print):
+        if engine not in ENGINES:
+            raise ValueError(f"Engine tidak dikenal: {engine}")
+        self.engine = engine
+        self.input_dir = input_dir
+        self.log = log
+        self.datasets = {}
+        self.sources = {}   # dataset -> tabel SQL asalnya (read_table), untuk filter/select pushdown
+        self._spark = None
+        self._tmp = tempfile.TemporaryDirectory(prefix="etl_recipe_")
+
+    def close(self):
+        self._tmp.cleanup()
+
+    # --- Spark & pemilihan engine ---
+    def spark(self, nbytes=None):
+        if self._spark is None:
+            self._spark = build_spark(nbytes)
+        tune_spark(self._spark, nbytes)
+        return self._spark
+
+    def as_spark(self, data):
+        if is_spark(data):
+            return data
+        sdf, coerced = to_spark(self.spark(frame_bytes(data)), data)
+        if coerced:
+            self.log(f"  kolom diubah ke String: {', '.join(map(str, coerced))}")
+        return sdf
+
+    def engine_for(self, op, data, columns=()):
+        if self.engine == "spark" and op != "transpose":
+            return "spark"
+        if is_spark(data):
+            return choose_engine(op, None, None, columns)
+        return choose_engine(op, column_kinds(data), frame_bytes(data), columns)
+
+    # --- eksekusi ---
+    def run(self, recipe):
+        total = len(recipe.steps)
+        for i, step in enumerate(recipe.steps, 1):
+            step = dict(step)
+            op, name = step.pop("op"), step.pop("dataset", None)
+            start = time.perf_counter()
+            if op in EXTRACT_OPS:
+                engine = self.extract(op, name, step)
+            elif op in TRANSFORM_OPS:
+                engine = self.transform(op, name, step)
+            elif op in LOAD_OPS:
+                engine = self.load(op, name, step)
+            else:
+                raise ValueError(f"Langkah {i}: operasi tidak dikenal: {op}")
+            self.log(f"[{i}/{total}] {op} {name or ''} -> {engine} ({time.perf_counter() - start:.2f} s)")
+        return self.datasets
+
+    def extract(self, op, name, p):
+        self.sources.pop(name, None)
+        if op == "read_file":
+            path = os.path.join(self.input_dir, p.get("path") or name)
+            big = os.path.getsize(path) > PANDAS_MAX_MB * 1024 ** 2
+            if (self.engine == "spark" or big) and path.endswith((".csv", ".parquet")):
+                spark = self.spark(os.path.getsize(path))
+                if path.endswith(".csv"):
+                    self.datasets[name] = spark.read.csv(path, header=True, inferSchema=True)
+                else:
+                    self.datasets[name] = spark.read.parquet(path)
+                return "spark"
+            with open(path, "rb") as f:
+                df, _ = with_compact(read_upload(path, f), p.get("compact"))
+            self.datasets[name] = self.as_spark(df) if self.engine == "spark" else df
+            return "pandas"
+        if op == "read_table":
+            dsn = resolve_dsn(p["dsn"])
+            table = p.get("table") or name
+            if self.engine == "spark":
+                self.datasets[name] = read_jdbc(self.spark(), dsn, table, p.get("partition_column"),
+                                                p.get("num_partitions", 1), p.get("chunk_rows", DB_CHUNK_ROWS))
+                return "spark"
+            engine = make_engine(dsn)
+            try:
+                for _, df, err in load_tables(engine, [table], p.get("partition_column"),
+                                              p.get("num_partitions", 1), p.get("chunk_rows", DB_CHUNK_ROWS)):
+                    if err is not None:
+                        raise err
+                    self.datasets[name] = with_compact(df, p.get("compact"))[0]
+            finally:
+                engine.dispose()
+            self.sources[name] = {"dsn": dsn, "table": table, "columns": None, "filters": [],
+                                  "compact": p.get("compact"), "chunk_rows": p.get("chunk_rows", DB_CHUNK_ROWS)}
+            return "pandas"
+        # union
+        members = [self.datasets[m] for m in p["members"]]
+        if self.engine == "spark" or any(is_spark(m) for m in members):
+            result = self.as_spark(members[0])
+            for m in members[1:]:
+                result = result.unionByName(self.as_spark(m), allowMissingColumns=True)
+            self.datasets[name] = result
+            return "spark"
+        out_dir = os.path.join(self._tmp.name, f"union_{len(os.listdir(self._tmp.name))}")
+        _, casts, _ = union_to_parquet(members, out_dir)
+        if casts:
+            self.log("  penyesuaian tipe: " + " | ".join(casts))
+        self.datasets[name] = pd.read_parquet(out_dir)
+        return "pandas"
+
+    def transform(self, op, name, p):
+        if op == "join":
+            return self.join(name, p)
+        if p.get("pushdown") and name in self.sources:
+            return self.pushdown(op, name, p)
+        # Data berubah: tidak lagi sama dengan tabel sumbernya
+        self.sources.pop(name, None)
+        data = self.datasets[name]
+        columns = p.get("columns") or ([p["column"]] if "column" in p else [])
+        engine = self.engine_for(op, data, columns)
+        if engine == "pandas":
+            df = to_pandas(data)
+            if op == "dedup":
+                result, removed = dedup_pandas(df, p.get("subset"), p.get("keep", "first"), p.get("order_by"))
+                self.log(f"  {removed} baris duplikat dihapus")
+            else:
+                result = {
+                    "fill": lambda: fill_blank_pandas(df, p["value"], per_column=p.get("per_column")),
+                    "replace": lambda: replace_pandas(df, p["column"], p["old"], p["new"]),
+                    "bulk_replace": lambda: bulk_replace_pandas(df, p["columns"], p.get("mapping"), p.get("rules", [])),
+                    "filter": lambda: filter_contains_pandas(df, p["column"], p["value"]),
+                    "select": lambda: df[p["columns"]],
+                    "transpose": lambda: df.T.reset_index(),
+                    "split": lambda: split_pandas(df, p["column"], p["delimiter"]),
+                    "merge": lambda: merge_columns_pandas(df, p["columns"], p["separator"], p["new_column"]),
+                }[op]()
+        else:
+            sdf = self.as_spark(data)
+            result = {
+                "fill": lambda: fill_blank_spark(sdf, p["value"], p.get("per_column")),
+                "dedup": lambda: dedup_spark(sdf, p.get("subset"), p.get("keep", "first"),
+                                             p.get("order_by")).drop(DUP_COUNT_COL),
+                "replace": lambda: replace_spark(sdf, p["column"], p["old"], p["new"]),
+                "bulk_replace": lambda: bulk_replace_spark(sdf, p["columns"], p.get("mapping"), p.get("rules", [])),
+                "filter": lambda: filter_contains_spark(sdf, p["column"], p["value"]),
+                "select": lambda: sdf.select(*p["columns"]),
+                "split": lambda: split_spark(sdf, p["column"], p["delimiter"]),
+                "merge": lambda: merge_columns_spark(sdf, p["columns"], p["separator"], p["new_column"]),
+                "cast": lambda: cast_spark(sdf, p["column"], p["target"]),
+            }[op]()
+        self.datasets[name] = result
+        return engine
+
+    def pushdown(self, op, name, p):
+        # Filter/select yang di-push ke sumber saat direkam: dibaca ulang dari
+        # database dengan WHERE / kolom terpilih, seperti halaman Transform
+        source = self.sources[name]
+        if op == "filter":
+            source["filters"].append((p["column"], p["value"]))
+        else:
+            source["columns"] = p["columns"]
+        engine = make_engine(source["dsn"])
+        try:
+            df = read_pushdown(engine, source["table"], source["columns"], source["filters"], source["chunk_rows"])
+        finally:
+            engine.dispose()
+        self.datasets[name] = with_compact(df, source["compact"])[0]
+        return "sumber"
+
+    def join(self, name, p):
+        # dataset = hasil join; recipe lama: dataset = tabel kiri, hasil di p["name"]
+        if "left" in p:
+            left_name, out = p["left"], name
+        else:
+            left_name, out = name, p.get("name") or f"Join_{name}_{p['right']}"
+        left, right = self.datasets[left_name], self.datasets[p["right"]]
+        how, left_on, right_on = p.get("how", "left"), p["left_on"], p["right_on"]
+        both_pandas = self.engine != "spark" and not is_spark(left) and not is_spark(right)
+        size = lambda d: estimate_bytes(d) if is_spark(d) else frame_bytes(d)
+        strategy = choose_join_strategy(size(left), size(right), both_pandas, how)
+        if strategy == "pandas-hash":
+            result = join_pandas(left, right, left_on, right_on, how)
+        else:
+            result = join_spark(self.as_spark(left), self.as_spark(right), left_on, right_on, how,
+                                broadcast_right=(strategy == "broadcast"))
+        self.sources.pop(out, None)
+        self.datasets[out] = result
+        return strategy
+
+    def load(self, op, name, p):
+        data = self.datasets[name]
+        if op == "to_parquet":
+            if is_spark(data):
+                write_spark(data, p["path"], "parquet", p.get("compression", "snappy"), mode="overwrite")
+                return "spark"
+            write_parquet_file(data, p["path"], p.get("compression", "snappy"),
+                               p.get("row_group_rows", ROW_GROUP_ROWS), p.get("dictionary_cols", ()))
+            return "pandas"
+        if op == "to_spark":
+            nbytes = estimate_bytes(data) if is_spark(data) else frame_bytes(data)
+            rows = None if is_spark(data) else len(data)
+            write_spark(self.as_spark(data), p["url"], p.get("format", "parquet"), p.get("compression", "snappy"),
+                        p.get("partition_by", ()), p.get("mode", "overwrite"), p.get("target_file_mb", 128),
+                        nbytes, rows)
+            return "spark"
+        # to_sql
+        dsn, mode = resolve_dsn(p["dsn"]), p.get("mode", "replace")
+        if is_spark(data) and mode != "upsert" and not p.get("bulk_infile"):
+            write_jdbc(data, dsn, p["table"], mode, p.get("batch_rows", LOAD_BATCH_ROWS), p.get("workers", LOAD_WORKERS))
+            return "spark"
+        engine = make_engine(dsn, local_infile=p.get("bulk_infile", False))
+        try:
+            stats = push_table(engine, to_pandas(data), p["table"], mode, p.get("key"),
+                               p.get("chunk_rows", LOAD_CHUNK_ROWS), p.get("batch_rows", LOAD_BATCH_ROWS),
+                               p.get("workers", LOAD_WORKERS), p.get("bulk_infile", False))
+        finally:
+            engine.dispose()
+        self.log(f"  {stats['rows']} baris ({stats['rows_per_sec']:.0f} baris/detik)")
+        return "pandas"
+
+
+def run_recipe(recipe, engine="auto", input_dir=".", log=print):
+    runner = RecipeRunner(engine, input_dir, log)
+    try:
+        return runner.run(recipe)
+    finally:
+        runner.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jalankan recipe ETL hasil rekaman simple_etl.py tanpa Streamlit.")
+    parser.add_argument("recipe", help="File recipe (.yaml / .yml / .json)")
+    parser.add_argument("--input-dir", default=".", help="Folder file sumber (read_file)")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="auto: pandas/Spark per operasi, spark: Spark dari awal sampai akhir")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    run_recipe(Recipe.load(args.recipe), args.engine, args.input_dir)
+    print(f"Selesai dalam {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
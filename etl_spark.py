@@ -0,0 +1,189 @@
+# --- HELPER SPARK UNTUK simple_etl.py ---
+# Isi data_store bisa berupa pandas DataFrame (sudah di memory) atau
+# Spark DataFrame (plan lazy yang belum dieksekusi). Fungsi di sini
+# menyamakan keduanya supaya halaman Streamlit tidak perlu peduli.
+
+import math
+import os
+
+import sys
+
+import psutil
+import pyarrow as pa
+
+from etl_metrics import conversion
+
+PREVIEW_ROWS = 5
+
+# Konversi pandas <-> Spark lewat Arrow, dikirim per batch
+ARROW_BATCH_ROWS = 10000
+ARROW_CONF = {
+    "spark.sql.execution.arrow.pyspark.enabled": "true",
+    "spark.sql.execution.arrow.pyspark.fallback.enabled": "true",
+    "spark.sql.execution.arrow.maxRecordsPerBatch": str(ARROW_BATCH_ROWS),
+}
+
+
+def is_spark(obj):
+    # Cek lewat nama modul supaya tidak perlu import pyspark di sini
+    return type(obj).__module__.startswith("pyspark.sql")
+
+
+# --- PROFIL SPARK SESSION ---
+# Data kecil tidak perlu 200 shuffle partition & executor besar
+SMALL_DATA_BYTES = 64 * 1024 ** 2
+LARGE_DATA_BYTES = 1024 ** 3
+BYTES_PER_PARTITION = 128 * 1024 ** 2
+MAX_SHUFFLE_PARTITIONS = 200
+SIZE_SAMPLE_ROWS = 1000
+
+
+def frame_bytes(df):
+    # memory_usage(deep=True) terlalu mahal untuk kolom object besar,
+    # jadi ukuran string diperkirakan dari sampel baris
+    if is_spark(df):
+        return 0
+    total = int(df.memory_usage(index=True, deep=False).sum())
+    n = len(df)
+    if n == 0:
+        return total
+    sample = df.iloc[:SIZE_SAMPLE_ROWS]
+    for c in df.columns[df.dtypes == object]:
+        per_row = sample[c].memory_usage(index=False, deep=True) / len(sample)
+        total += int(per_row * n) - 8 * n
+    return total
+
+
+def estimate_bytes(obj):
+    # Perkiraan ukuran data aktif; None jika tidak diketahui
+    if obj is None:
+        return None
+    if is_spark(obj):
+        try:
+            return int(obj._jdf.queryExecution().optimizedPlan().stats().sizeInBytes().toLong())
+        except Exception:
+            return None
+    # Kolom teks dihitung isi string-nya (memory_usage biasa hanya 8 byte per pointer)
+    return frame_bytes(obj)
+
+
+def shuffle_partitions(nbytes):
+    if nbytes is None:
+        return MAX_SHUFFLE_PARTITIONS
+    return max(2, min(MAX_SHUFFLE_PARTITIONS, math.ceil(nbytes / BYTES_PER_PARTITION)))
+
+
+def spark_profile(nbytes):
+    # Konfigurasi saat JVM dinyalakan (master & driver memory tidak bisa diubah setelahnya)
+    total_gb = psutil.virtual_memory().total // 1024 ** 3
+    if nbytes is not None and nbytes < SMALL_DATA_BYTES:
+        master, driver_mem = "local[2]", "1g"
+    elif nbytes is not None and nbytes < LARGE_DATA_BYTES:
+        master, driver_mem = "local[*]", "2g"
+    else:
+        master, driver_mem = "local[*]", f"{max(2, total_gb // 2)}g"
+    conf = {
+        "spark.master": os.environ.get("ETL_SPARK_MASTER", master),
+        "spark.driver.memory": driver_mem,
+        "spark.ui.showConsoleProgress": "false",
+        "spark.sql.adaptive.enabled": "true",
+        "spark.sql.adaptive.coalescePartitions.enabled": "true",
+        "spark.sql.shuffle.partitions": str(shuffle_partitions(nbytes)),
+    }
+    conf.update(ARROW_CONF)
+    return conf
+
+
+def spark_loaded():
+    # True jika pyspark sudah di-import (JVM mungkin sudah jalan)
+    return "pyspark" in sys.modules
+
+
+def build_spark(nbytes=None):
+    # findspark & pyspark baru di-import di sini, saat Spark pertama kali dipakai
+    import findspark
+    findspark.init()
+    from pyspark.sql import SparkSession
+
+    builder = SparkSession.builder.appName("StreamlitETL")
+    for k, v in spark_profile(nbytes).items():
+        builder = builder.config(k, v)
+    return builder.getOrCreate()
+
+
+def tune_spark(spark, nbytes):
+    # Dipanggil tiap operasi: shuffle partition mengikuti ukuran data aktif
+    spark.conf.set("spark.sql.shuffle.partitions", str(shuffle_partitions(nbytes)))
+
+
+def enable_arrow(spark):
+    for k, v in ARROW_CONF.items():
+        spark.conf.set(k, v)
+
+
+def to_arrow(pdf):
+    # Konversi per kolom: hanya kolom yang gagal (mis. object campuran
+    # angka & teks) yang dijadikan string, kolom lain tetap bertipe asli.
+    arrays, coerced = [], []
+    for c in pdf.columns:
+        s = pdf[c]
+        try:
+            arr = pa.array(s, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            arr = pa.array(s.astype(str).where(s.notna(), None), type=pa.string(), from_pandas=True)
+            coerced.append(c)
+        arrays.append(arr)
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in pdf.columns]), coerced
+
+
+def spark_arrow_types(table):
+    # Tipe Arrow dari dtype compact yang belum diterima Spark: category
+    # (dictionary) dan string[pyarrow] (large_string) dijadikan string biasa
+    fields = []
+    for field in table.schema:
+        t = field.type
+        if pa.types.is_dictionary(t):
+            t = t.value_type
+        if pa.types.is_large_string(t):
+            t = pa.string()
+        fields.append(field.with_type(t))
+    schema = pa.schema(fields)
+    return table if schema.equals(table.schema) else table.cast(schema)
+
+
+def to_spark(spark, obj):
+    # Return (spark_df, kolom_yang_dikonversi_ke_string)
+    if is_spark(obj):
+        return obj, []
+    enable_arrow(spark)
+    with conversion() as info:
+        table, coerced = to_arrow(obj)
+        table = spark_arrow_types(table)
+        info["bytes"] = table.nbytes
+        return spark.createDataFrame(table), coerced
+
+
+def collect(df):
+    # Spark -> pandas (dicatat sebagai waktu konversi di instrumentasi)
+    with conversion() as info:
+        pdf = df.toPandas()
+        info["bytes"] = int(pdf.memory_usage(index=True).sum())
+    return pdf
+
+
+def to_pandas(obj):
+    # Materialisasi penuh: hanya dipakai di Load / operasi yang butuh pandas
+    return collect(obj) if is_spark(obj) else obj
+
+
+def preview(obj, n=PREVIEW_ROWS):
+    # Preview dibatasi n baris, plan Spark cukup dieksekusi sampai LIMIT n
+    if is_spark(obj):
+        return obj.limit(n).toPandas()
+    return obj.head(n)
+
+
+def commit(df, lazy):
+    # Mode lazy: simpan plan Spark apa adanya, transform berikutnya cukup
+    # menambah plan. Mode biasa: collect ke pandas seperti sebelumnya.
+    return df if lazy else collect(df)
@@ -0,0 +1,574 @@
+# --- DATA STORE DENGAN BATAS RAM ---
+# Pengganti dict biasa untuk st.session_state.data_store. Dataset yang paling
+# lama tidak dipakai (LRU) di-spill ke file Arrow IPC di disk jika total RAM
+# melebihi budget, lalu dibaca ulang (memory-mapped) saat diakses lagi.
+# Versi lama tiap dataset disimpan (terbatas) untuk Undo/Redo; dengan
+# copy-on-write pandas, kolom yang tidak diubah dibagi antar versi.
+
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from etl_dtypes import restore_dtypes
+from etl_spark import PREVIEW_ROWS, frame_bytes, is_spark, preview, to_pandas
+
+DEFAULT_BUDGET_MB = int(os.environ.get("ETL_STORE_BUDGET_MB", "1024"))
+# Jumlah versi lama per dataset yang disimpan untuk Undo (0 = tanpa history)
+HISTORY_MAX = int(os.environ.get("ETL_HISTORY_MAX", "10"))
+
+
+def _buffer_id(s):
+    # Kolom yang sama di dua versi (dibagi lewat copy-on-write) menunjuk ke
+    # buffer yang sama: alamat data numpy, atau objek ExtensionArray-nya
+    if isinstance(s.dtype, np.dtype):
+        arr = s.to_numpy(copy=False)
+        return ("np", arr.__array_interface__["data"][0], arr.nbytes)
+    return ("ea", id(s.array))
+
+
+def _buffers(df):
+    # {kolom: (id_buffer, bytes)}
+    return {c: (_buffer_id(df.iloc[:, i]), frame_bytes(df.iloc[:, [i]])) for i, c in enumerate(df.columns)}
+
+
+def _parquet_bytes(path):
+    # Ukuran data (tidak terkompresi) dari metadata Parquet: file atau folder part-*
+    files = [os.path.join(path, f) for f in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+    total = 0
+    for f in files:
+        meta = pq.read_metadata(f)
+        total += sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+    return total
+
+
+def pq_columns(path):
+    # Nama kolom dari schema Parquet (file atau folder part-*), tanpa baca data
+    if os.path.isdir(path):
+        path = os.path.join(path, sorted(os.listdir(path))[0])
+    return [n for n in pq.read_schema(path).names if not n.startswith("__index_level_")]
+
+
+def _parts(path):
+    # File spill / Parquet bisa berupa folder part-* (hasil append)
+    return [os.path.join(path, f) for f in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+
+
+def _read_ipc(path):
+    tables = []
+    for part in _parts(path):
+        with pa.memory_map(part) as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+
+def _ipc_schema(path):
+    with pa.memory_map(_parts(path)[0]) as source:
+        return pa.ipc.open_file(source).schema
+
+
+def _file_summary(path, n):
+    # Kolom, jumlah baris & n baris pertama langsung dari file (metadata /
+    # batch pertama), tanpa membaca seluruh isi file
+    if path.endswith(".pkl"):
+        df = pd.read_pickle(path)
+        return list(df.columns), len(df), df.head(n)
+    if path.endswith(".parquet"):
+        dataset = ds.dataset(path, format="parquet")
+        return pq_columns(path), dataset.count_rows(), dataset.head(n).to_pandas()
+    rows, head = 0, None
+    for part in _parts(path):
+        with pa.memory_map(part) as source:
+            reader = pa.ipc.open_file(source)
+            rows += sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            if head is None and reader.num_record_batches:
+                head = pa.Table.from_batches([reader.get_batch(0).slice(0, n)]).to_pandas()
+    if head is None:
+        head = _ipc_schema(path).empty_table().to_pandas()
+    return list(head.columns), rows, head
+
+
+def _write_spill(df, path):
+    try:
+        table = pa.Table.from_pandas(df)
+        path += ".arrow"
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Kolom campuran yang tidak bisa jadi Arrow: simpan apa adanya
+        path += ".pkl"
+        df.to_pickle(path)
+    return path
+
+
+def _read_spill(path):
+    if path.endswith(".pkl"):
+        return pd.read_pickle(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return _read_ipc(path).to_pandas()
+
+
+class DataStore:
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, spill_dir=None):
+        self.budget_bytes = budget_mb * 1024 ** 2
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="etl_store_")
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        self._keys = {}              # urutan insert (untuk dropdown)
+        self._resident = OrderedDict()  # key -> data di RAM, urutan LRU
+        self._files = {}             # key -> file spill (masih valid)
+        self._sizes = {}
+        self._meta = {}              # key -> info tambahan (watermark, dtype compact, dll)
+        self._summary = {}           # key -> kolom/baris/preview (cache, hilang saat data berubah)
+        self._labels = {}            # key -> operasi yang menghasilkan versi sekarang
+        self._unlabeled = set()      # key yang versi sekarangnya baru ditulis, belum diberi label
+        self._history = {}           # key -> versi lama (lama -> baru), untuk Undo
+        self._redo = {}              # key -> versi yang di-Undo, untuk Redo
+        self._pins = {}              # id(plan Spark) -> file/folder store yang dibaca plan itu
+        self._trash = set()          # file yang sudah dilepas, dihapus setelah tidak dibaca plan lagi
+        self.history_max = HISTORY_MAX
+
+    # --- interface dict ---
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self):
+        return list(self._keys)
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key not in self._resident:
+            self._resident[key] = _read_spill(self._files[key])
+            self._enforce(keep=key)
+        self._resident.move_to_end(key)
+        return self._resident[key]
+
+    def __setitem__(self, key, value):
+        # Data berubah: tidak lagi sama dengan sumber aslinya (tidak bisa pushdown).
+        # Versi sebelumnya masuk history (Undo).
+        if key in self._keys:
+            self._replace(key)
+        # Dataset mode compact: dtype yang hilang (mis. setelah lewat Spark) dipasang lagi
+        dtypes = self._meta.get(key, {}).get("dtypes")
+        if dtypes and not is_spark(value):
+            value = restore_dtypes(value, dtypes)
+        if is_spark(value):
+            self._pins[id(value)] = self._plan_paths(value)
+        self._keys[key] = True
+        self._unlabeled.add(key)
+        self._resident[key] = value
+        self._resident.move_to_end(key)
+        self._sizes[key] = frame_bytes(value)
+        self._collect()
+        self._enforce(keep=key)
+
+    def __delitem__(self, key):
+        del self._keys[key]
+        self._resident.pop(key, None)
+        self._sizes.pop(key, None)
+        self._meta.pop(key, None)
+        self._summary.pop(key, None)
+        self._labels.pop(key, None)
+        self._unlabeled.discard(key)
+        self._drop_file(key)
+        for version in self._history.pop(key, []) + self._redo.pop(key, []):
+            self._drop_version(version)
+        self._collect()
+
+    def meta(self, key):
+        # Info tambahan per dataset; tetap ada walau datanya di-update
+        return self._meta.setdefault(key, {})
+
+    def incremental_state(self, key):
+        # (kolom, watermark, seen) untuk refresh incremental; None jika dataset
+        # bukan lagi tabel SQL apa adanya (sudah di-Transform atau di-pushdown)
+        meta = self._meta.get(key, {})
+        source = meta.get("source") or {}
+        if source.get("kind") != "sql" or source.get("columns") or source.get("filters") \
+                or "watermark_col" not in meta or "watermark_seen" not in meta:
+            return None
+        return meta["watermark_col"], meta.get("watermark"), meta["watermark_seen"]
+
+    def summary(self, key, n=PREVIEW_ROWS):
+        # {"columns", "rows", "preview", "lazy"} untuk tampilan halaman. Dihitung
+        # sekali per versi data: file di disk tidak dibaca ulang ke RAM, plan
+        # Spark cukup dieksekusi sampai LIMIT n (rows None = belum diketahui).
+        if key not in self._keys:
+            raise KeyError(key)
+        if key not in self._summary:
+            data = self._resident.get(key)
+            if data is None:
+                columns, rows, head = _file_summary(self._files[key], n)
+                lazy = False
+            else:
+                lazy = is_spark(data)
+                columns, rows, head = list(data.columns), (None if lazy else len(data)), preview(data, n)
+            self._summary[key] = {"columns": columns, "rows": rows, "preview": head, "lazy": lazy}
+        return self._summary[key]
+
+    def cached(self, key, name, compute):
+        # Simpan hasil compute() (mis. jenis kolom) bersama summary; dihitung ulang saat data berubah
+        summary = self.summary(key)
+        if name not in summary:
+            summary[name] = compute()
+        return summary[name]
+
+    def append(self, key, df):
+        # Tambah baris ke dataset yang sudah ada. Dataset di disk (Parquet atau
+        # spill Arrow, mis. tabel DB yang di-refresh incremental) cukup ditambah
+        # satu file part baru, tanpa membaca ulang isi yang lama.
+        if key not in self._keys:
+            self[key] = df
+            return
+        path = self._files.get(key)
+        # File yang masih dibaca plan lazy tidak boleh diubah jadi folder
+        if key not in self._resident and path and path.endswith((".parquet", ".arrow")) and path not in self._pinned():
+            if self._append_part(path, df):
+                self._sizes[key] = _parquet_bytes(path) if path.endswith(".parquet") else self._sizes[key] + frame_bytes(df)
+                self._summary.pop(key, None)
+                return
+        source = self.meta(key).get("source")
+        self[key] = pd.concat([to_pandas(self[key]), df], ignore_index=True)
+        if source:
+            self.meta(key)["source"] = source
+
+    def materialize(self, key, df):
+        # Hasil eksekusi plan lazy menggantikan plan di versi yang sama (bukan
+        # versi baru): label, history & redo tidak berubah
+        dtypes = self._meta.get(key, {}).get("dtypes")
+        if dtypes:
+            df = restore_dtypes(df, dtypes)
+        self._resident[key] = df
+        self._resident.move_to_end(key)
+        self._sizes[key] = frame_bytes(df)
+        self._summary.pop(key, None)
+        self._collect()
+        self._enforce(keep=key)
+
+    def _append_part(self, path, df):
+        # Tulis df sebagai part baru (file tunggal dipindah jadi part-00000).
+        # False jika tipe kolom tidak cocok dengan schema lama.
+        ext = os.path.splitext(path)[1]
+        schema = pq.read_schema(_parts(path)[0]) if ext == ".parquet" else _ipc_schema(path)
+        try:
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, KeyError):
+            return False
+        if os.path.isfile(path):
+            tmp = path + ".tmp"
+            os.rename(path, tmp)
+            os.mkdir(path)
+            os.rename(tmp, os.path.join(path, "part-00000" + ext))
+        part = os.path.join(path, f"part-{len(os.listdir(path)):05d}{ext}")
+        if ext == ".parquet":
+            pq.write_table(table, part)
+        else:
+            with pa.OSFile(part, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return True
+
+    # --- dataset yang langsung ditulis ke disk (streaming ingest) ---
+    def new_path(self, suffix):
+        return os.path.join(self.spill_dir, uuid.uuid4().hex + suffix)
+
+    def add_file(self, key, path):
+        # Daftarkan file Parquet sebagai dataset yang berada di disk
+        if key in self._keys:
+            self._replace(key)
+        self._keys[key] = True
+        self._unlabeled.add(key)
+        self._files[key] = path
+        self._summary.pop(key, None)
+        self._sizes[key] = _parquet_bytes(path)
+        self._collect()
+
+    def file_schema(self, key):
+        # Schema Arrow dataset di disk (Parquet / spill Arrow), None jika di RAM atau pickle
+        path = self._files.get(key)
+        if key in self._resident or not path:
+            return None
+        if path.endswith(".parquet"):
+            return pq.read_schema(_parts(path)[0])
+        if path.endswith(".arrow"):
+            return _ipc_schema(path)
+        return None
+
+    def parquet_path(self, key):
+        # File Parquet yang masih sama dengan isi dataset (bisa dibaca Spark langsung)
+        path = self._files.get(key)
+        return path if path and path.endswith(".parquet") else None
+
+    def arrow_dataset(self, key):
+        # Spill Arrow IPC di disk sebagai pyarrow dataset (memory-map, dibaca per
+        # batch tanpa ke pandas); None jika data di RAM, Parquet atau pickle
+        path = self._files.get(key)
+        if key in self._resident or not path or not path.endswith(".arrow"):
+            return None
+        return ds.dataset(path, format="ipc", filesystem=pa.fs.LocalFileSystem(use_mmap=True))
+
+    # --- history versi (Undo / Redo / diff) ---
+    # Versi = dict: label, data (di RAM) atau file (di disk), source, watermark
+    # (+ watermark_seen), size, rows, columns, buffers (id buffer per kolom, hanya untuk pandas).
+    def set_label(self, key, label):
+        # Nama operasi yang menghasilkan versi sekarang (ditampilkan di history).
+        # Hanya versi yang baru ditulis; return False jika key tidak diganti
+        if key not in self._unlabeled:
+            return False
+        self._unlabeled.discard(key)
+        self._labels[key] = label
+        return True
+
+    def _capture(self, key):
+        data = self._resident.get(key)
+        pandas_data = data is not None and not is_spark(data)
+        summary = self._summary.get(key, {})
+        meta = self._meta.get(key, {})
+        return {"label": self._labels.get(key), "data": data, "file": self._files.get(key),
+                "source": meta.get("source"), "watermark": meta.get("watermark"),
+                "watermark_seen": meta.get("watermark_seen"), "size": self._sizes.get(key, 0),
+                "rows": len(data) if pandas_data else summary.get("rows"),
+                "columns": list(data.columns) if data is not None else summary.get("columns"),
+                "buffers": _buffers(data) if pandas_data else {}}
+
+    def _replace(self, key):
+        # Versi sekarang dilepas dari key: disimpan ke history, atau dibuang jika history mati
+        if self.history_max > 0:
+            version = self._capture(key)
+            self._files.pop(key, None)
+            history = self._history.setdefault(key, [])
+            history.append(version)
+            while len(history) > self.history_max:
+                self._drop_version(history.pop(0))
+            for old in self._redo.pop(key, []):
+                self._drop_version(old)
+        else:
+            self._drop_file(key)
+        self._resident.pop(key, None)
+        # Isi berubah: sumber & watermark tidak berlaku lagi (refresh incremental
+        # akan menambah baris mentah ke data yang sudah di-Transform)
+        for name in ("source", "watermark", "watermark_seen"):
+            self._meta.get(key, {}).pop(name, None)
+        self._summary.pop(key, None)
+        self._labels.pop(key, None)
+
+    def _restore(self, key, version):
+        if version["data"] is not None:
+            self._resident[key] = version["data"]
+            self._resident.move_to_end(key)
+        if version["file"]:
+            self._files[key] = version["file"]
+        self._sizes[key] = version["size"]
+        self._summary.pop(key, None)
+        self._labels[key] = version["label"]
+        self._unlabeled.discard(key)
+        # Watermark ikut versinya: baris refresh yang di-Undo diambil lagi saat refresh berikutnya
+        for name in ("source", "watermark", "watermark_seen"):
+            value = version.get(name)
+            if value is not None:
+                self.meta(key)[name] = value
+            else:
+                self._meta.get(key, {}).pop(name, None)
+        self._enforce(keep=key)
+
+    def _swap(self, key, src, dst):
+        # Versi terakhir di src jadi versi sekarang, versi sekarang pindah ke dst
+        if not src.get(key):
+            return None, None
+        current = self._capture(key)
+        version = src[key].pop()
+        self._resident.pop(key, None)
+        self._files.pop(key, None)
+        dst.setdefault(key, []).append(current)
+        self._restore(key, version)
+        return current, version
+
+    def undo(self, key):
+        # Return versi yang dibatalkan (label = operasinya), None jika tidak ada history
+        return self._swap(key, self._history, self._redo)[0]
+
+    def redo(self, key):
+        # Return versi yang dipasang lagi (label = operasinya), None jika tidak ada
+        return self._swap(key, self._redo, self._history)[1]
+
+    def can_undo(self, key):
+        return bool(self._history.get(key))
+
+    def can_redo(self, key):
+        return bool(self._redo.get(key))
+
+    def _current_buffers(self, key):
+        data = self._resident.get(key)
+        if data is None or is_spark(data):
+            return set()
+        return {_buffer_id(data.iloc[:, i]) for i in range(data.shape[1])}
+
+    def _version_bytes(self, key):
+        # Byte RAM yang benar-benar dipakai tiap versi lama: kolom yang dibagi
+        # dengan versi lebih baru (atau versi sekarang) tidak dihitung lagi
+        seen = self._current_buffers(key)
+        sizes = []
+        for version in reversed(self._history.get(key, []) + self._redo.get(key, [])):
+            own = 0
+            for bid, nbytes in version["buffers"].values():
+                if bid not in seen:
+                    own += nbytes
+                    seen.add(bid)
+            sizes.append((version, own))
+        return sizes
+
+    def history_bytes(self):
+        return sum(n for key in set(self._history) | set(self._redo) for _, n in self._version_bytes(key))
+
+    def history(self, key):
+        # Daftar versi untuk ditampilkan: lama -> baru, lalu versi sekarang
+        own = {id(v): n for v, n in self._version_bytes(key)}
+        rows = [{"versi": i + 1, "operasi": v["label"] or "-", "baris": v["rows"],
+                 "kolom": len(v["columns"]) if v["columns"] is not None else None,
+                 "lokasi": "RAM" if v["data"] is not None else "disk",
+                 "MB unik": round(own[id(v)] / 1024 ** 2, 2)}
+                for i, v in enumerate(self._history.get(key, []))]
+        summary = self.summary(key)
+        rows.append({"versi": len(rows) + 1, "operasi": (self._labels.get(key) or "-") + " (sekarang)",
+                     "baris": summary["rows"], "kolom": len(summary["columns"]),
+                     "lokasi": "lazy" if summary["lazy"] else ("disk" if self.is_spilled(key) else "RAM"),
+                     "MB unik": round(self._sizes[key] / 1024 ** 2, 2)})
+        return rows
+
+    def diff(self, key):
+        # Perbedaan versi sekarang dengan versi sebelumnya, hanya dari metadata
+        # (nama kolom, jumlah baris, id buffer): tidak membandingkan isi sel.
+        # rewritten None = tidak diketahui (salah satu versi bukan pandas di RAM).
+        if not self._history.get(key):
+            return None
+        prev = self._history[key][-1]
+        summary = self.summary(key)
+        before, after = prev["columns"] or [], summary["columns"]
+        common = [c for c in after if c in before]
+        current = self._resident.get(key)
+        rewritten = None
+        if prev["buffers"] and current is not None and not is_spark(current):
+            rewritten = [c for c in common
+                         if _buffer_id(current.iloc[:, list(current.columns).index(c)]) != prev["buffers"][c][0]]
+        return {"label": self._labels.get(key), "rows": (prev["rows"], summary["rows"]),
+                "added": [c for c in after if c not in before],
+                "removed": [c for c in before if c not in after],
+                "rewritten": rewritten}
+
+    def _drop_version(self, version):
+        if version["file"]:
+            self._trash.add(version["file"])
+
+    def _spill_history(self):
+        # Versi lama paling tua di RAM ditulis ke disk; return False jika tidak ada lagi
+        for key in list(self._history) + list(self._redo):
+            for version, own in reversed(self._version_bytes(key)):
+                data = version["data"]
+                # Versi yang semua kolomnya dibagi tidak memakan RAM tambahan
+                if data is None or is_spark(data) or own == 0:
+                    continue
+                if version["file"] is None:
+                    version["file"] = _write_spill(data, os.path.join(self.spill_dir, uuid.uuid4().hex))
+                version["data"], version["buffers"] = None, {}
+                return True
+        return False
+
+    # --- budget & spill ---
+    def set_budget_mb(self, budget_mb):
+        self.budget_bytes = budget_mb * 1024 ** 2
+        self._enforce()
+
+    def resident_bytes(self):
+        return sum(self._sizes[k] for k in self._resident)
+
+    def spilled_bytes(self):
+        return sum(self._sizes[k] for k in self._keys if k not in self._resident)
+
+    def size_of(self, key):
+        return self._sizes.get(key)
+
+    def is_spilled(self, key):
+        return key in self._keys and key not in self._resident
+
+    def stats(self):
+        return [{"data": k,
+                 "status": "lazy" if is_spark(self._resident.get(k)) else ("disk" if self.is_spilled(k) else "RAM"),
+                 "MB": round(self._sizes[k] / 1024 ** 2, 2),
+                 "versi lama": len(self._history.get(k, [])),
+                 "sumber": self._meta.get(k, {}).get("source", {}).get("kind", "-")} for k in self._keys]
+
+    def _enforce(self, keep=None):
+        # Versi lama (Undo) ke disk lebih dulu, baru dataset yang sedang dipakai
+        while self.resident_bytes() + self.history_bytes() > self.budget_bytes:
+            if not self._spill_history():
+                break
+        for key in list(self._resident):
+            if self.resident_bytes() <= self.budget_bytes:
+                break
+            # Plan Spark tidak di-spill (belum ada datanya)
+            if key == keep or is_spark(self._resident[key]):
+                continue
+            self._spill(key)
+
+    def _spill(self, key):
+        if key not in self._files:
+            path = os.path.join(self.spill_dir, uuid.uuid4().hex)
+            self._files[key] = _write_spill(self._resident[key], path)
+        del self._resident[key]
+
+    def _drop_file(self, key):
+        path = self._files.pop(key, None)
+        if path:
+            self._trash.add(path)
+
+    # --- file yang dibaca plan Spark lazy ---
+    # Plan lazy membaca file Parquet milik store setiap kali dieksekusi, jadi
+    # file yang dilepas (history lewat batas, dataset dihapus) baru dihapus
+    # setelah tidak ada plan hidup (versi sekarang, history, redo) yang membacanya.
+    def _plan_paths(self, plan):
+        # File/folder di spill_dir yang dibaca plan (dari inputFiles, tanpa eksekusi)
+        try:
+            files = plan.inputFiles()
+        except Exception:
+            return set()
+        root = os.path.realpath(self.spill_dir)
+        paths = set()
+        for f in files:
+            rel = os.path.relpath(os.path.realpath(unquote(urlparse(f).path)), root)
+            if not rel.startswith(os.pardir):
+                paths.add(os.path.join(self.spill_dir, rel.split(os.sep)[0]))
+        return paths
+
+    def _pinned(self):
+        plans = [d for d in self._resident.values() if is_spark(d)]
+        plans += [v["data"] for versions in list(self._history.values()) + list(self._redo.values())
+                  for v in versions if is_spark(v["data"])]
+        live = {id(p) for p in plans}
+        # Plan yang sudah dibuang tidak lagi menahan file
+        self._pins = {i: paths for i, paths in self._pins.items() if i in live}
+        return set().union(*self._pins.values())
+
+    def _collect(self):
+        pinned = self._pinned()
+        for path in list(self._trash - pinned):
+            self._trash.discard(path)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,168 @@
+# --- GENERATOR DATA SINTETIS ---
+# Data penjualan & master produk dengan schema yang sama dengan
+# data_penjualan.csv / master_produk.csv, untuk skala 10K s/d 100M baris.
+# Ditulis per chunk (CSV dan/atau Parquet), jadi RAM yang dipakai hanya
+# sebesar satu chunk. Ada duplikat persis, nilai kosong, nilai kotor
+# (Jakarta vs Jkt) dan skew (beberapa produk/region jauh lebih sering).
+#
+#   python etl_synth.py --rows 1000000 --products 5000 --out data/synth
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SYNTH_CHUNK_ROWS = int(os.environ.get("ETL_SYNTH_CHUNK_ROWS", "1000000"))
+
+SALES_SCHEMA = pa.schema([
+    ("Transaction_ID", pa.string()), ("Date", pa.string()), ("Customer_Name", pa.string()),
+    ("Product_ID", pa.string()), ("Region", pa.string()), ("Quantity", pa.int64()),
+    ("Total_Price", pa.int64()), ("Status", pa.string()),
+])
+PRODUCT_SCHEMA = pa.schema([
+    ("Product_ID", pa.string()), ("Product_Name", pa.string()),
+    ("Category", pa.string()), ("Supplier", pa.string()),
+])
+
+REGIONS = ["Jakarta", "Bandung", "Surabaya", "Medan", "Semarang", "Makassar", "Yogyakarta", "Denpasar"]
+REGION_WEIGHTS = [0.35, 0.15, 0.15, 0.1, 0.08, 0.07, 0.06, 0.04]
+# Penulisan region yang tidak konsisten, seperti "Jkt" di data contoh
+REGION_ALIASES = {"Jakarta": "Jkt", "Surabaya": "Sby", "Yogyakarta": "Jogja"}
+STATUSES = ["Paid", "Pending", "Cancelled"]
+STATUS_WEIGHTS = [0.8, 0.15, 0.05]
+FIRST_NAMES = ["Andi", "Budi", "Citra", "Dedi", "Erik", "Fani", "Gita", "Hadi", "Indah", "Joko",
+               "Kiki", "Lina", "Made", "Nina", "Oki", "Putri", "Rudi", "Sari", "Tono", "Wati"]
+LAST_NAMES = ["Saputra", "Santoso", "Kirana", "Corbuzier", "Tohir", "Rose", "Pratama", "Wijaya",
+              "Halim", "Nugroho", "Lestari", "Siregar", "Hasibuan", "Gunawan", "Kusuma"]
+PRODUCTS = {
+    "Electronics": ["Laptop Gaming", "Monitor 24 Inch", "Tablet", "Smartphone", "Printer"],
+    "Accessories": ["Mouse Wireless", "Kabel HDMI", "Mechanical Keyboard", "Headset", "Webcam"],
+}
+SUPPLIERS = ["Asus Corp", "Logitech Inc", "Samsung", "Vention", "Razer", "Lenovo", "Xiaomi"]
+
+
+def product_ids(n_products):
+    width = max(3, len(str(n_products)))
+    return np.array([f"P-{i:0{width}d}" for i in range(1, n_products + 1)], dtype=object)
+
+
+def generate_products(n_products, seed=42):
+    rng = np.random.default_rng([seed, 0])
+    categories = np.array(list(PRODUCTS), dtype=object)[rng.integers(0, len(PRODUCTS), n_products)]
+    names = np.array([f"{PRODUCTS[c][rng.integers(0, len(PRODUCTS[c]))]} {i}"
+                      for i, c in enumerate(categories, 1)], dtype=object)
+    return pd.DataFrame({
+        "Product_ID": product_ids(n_products),
+        "Product_Name": names,
+        "Category": categories,
+        "Supplier": np.array(SUPPLIERS, dtype=object)[rng.integers(0, len(SUPPLIERS), n_products)],
+    })
+
+
+def _unit_prices(n_products, seed):
+    rng = np.random.default_rng([seed, 1])
+    return (rng.lognormal(13, 1.2, n_products) // 1000 * 1000 + 1000).astype(np.int64)
+
+
+def _skewed_index(rng, n, size, skew):
+    # skew > 1: distribusi Zipf (indeks kecil jauh lebih sering), 0: merata
+    if skew <= 1:
+        return rng.integers(0, size, n)
+    return (rng.zipf(skew, n) - 1) % size
+
+
+def generate_sales_chunk(start, n, n_products, seed=42, dup_rate=0.02, null_rate=0.01, skew=1.3):
+    # Baris start .. start+n. Seed chunk diturunkan dari (seed, start), jadi
+    # hasilnya bisa diulang persis untuk seed & chunk_rows yang sama.
+    rng = np.random.default_rng([seed, 2, start])
+    ids, prices = product_ids(n_products), _unit_prices(n_products, seed)
+
+    # Baris duplikat = salinan persis baris asli sebelumnya (termasuk Transaction_ID)
+    pos = np.arange(n)
+    is_dup = (rng.random(n) < dup_rate) & (pos > 0)
+    origin = np.maximum.accumulate(np.where(is_dup, 0, pos))
+
+    product = _skewed_index(rng, n, n_products, skew)
+    quantity = rng.integers(1, 10, n)
+    region = np.array(REGIONS, dtype=object)[rng.choice(len(REGIONS), n, p=REGION_WEIGHTS)]
+    dirty = rng.random(n) < 0.05
+    region[dirty] = [REGION_ALIASES.get(r, r) for r in region[dirty]]
+    region[rng.random(n) < null_rate] = None
+    qty_null = rng.random(n) < null_rate
+    days = rng.integers(0, 366, n)
+    qty = pd.array(quantity, dtype="Int64")
+    qty[qty_null] = pd.NA
+
+    df = pd.DataFrame({
+        "Transaction_ID": "TRX-" + pd.Series(start + pos + 1).astype(str),
+        "Date": np.datetime_as_string(np.datetime64("2024-01-01") + days.astype("timedelta64[D]"), unit="D"),
+        "Customer_Name": (np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n)] + " "
+                          + np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n)]),
+        "Product_ID": ids[product],
+        "Region": region,
+        "Quantity": qty,
+        "Total_Price": np.where(qty_null, 1, quantity) * prices[product],
+        "Status": np.array(STATUSES, dtype=object)[rng.choice(len(STATUSES), n, p=STATUS_WEIGHTS)],
+    })
+    return df.iloc[origin].reset_index(drop=True)
+
+
+def generate_sales(rows, n_products, seed=42, chunk_rows=SYNTH_CHUNK_ROWS, **opts):
+    # Yield DataFrame per chunk
+    for start in range(0, rows, chunk_rows):
+        yield generate_sales_chunk(start, min(chunk_rows, rows - start), n_products, seed, **opts)
+
+
+def _write_frames(frames, base, schema, formats):
+    # Tulis semua chunk ke <base>.csv dan/atau <base>.parquet; return path per format
+    paths = {fmt: f"{base}.{fmt}" for fmt in formats}
+    writer = pq.ParquetWriter(paths["parquet"], schema) if "parquet" in paths else None
+    try:
+        for i, df in enumerate(frames):
+            if "csv" in paths:
+                df.to_csv(paths["csv"], mode="w" if i == 0 else "a", header=(i == 0), index=False)
+            if writer:
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+    finally:
+        if writer:
+            writer.close()
+    return paths
+
+
+def write_dataset(out_dir, rows, n_products=1000, formats=("csv", "parquet"), seed=42,
+                  chunk_rows=SYNTH_CHUNK_ROWS, **opts):
+    # Return {"sales": {fmt: path}, "products": {fmt: path}}
+    os.makedirs(out_dir, exist_ok=True)
+    sales = _write_frames(generate_sales(rows, n_products, seed, chunk_rows, **opts),
+                          os.path.join(out_dir, "data_penjualan"), SALES_SCHEMA, formats)
+    products = _write_frames([generate_products(n_products, seed)],
+                             os.path.join(out_dir, "master_produk"), PRODUCT_SCHEMA, formats)
+    return {"sales": sales, "products": products}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat data penjualan & master produk sintetis.")
+    parser.add_argument("--rows", type=int, default=10000, help="Jumlah baris penjualan (10K s/d 100M)")
+    parser.add_argument("--products", type=int, default=1000, help="Jumlah produk di master")
+    parser.add_argument("--out", default="data/synth", help="Folder output")
+    parser.add_argument("--formats", nargs="+", choices=["csv", "parquet"], default=["csv", "parquet"])
+    parser.add_argument("--dup-rate", type=float, default=0.02, help="Proporsi baris duplikat persis")
+    parser.add_argument("--null-rate", type=float, default=0.01, help="Proporsi Region/Quantity kosong")
+    parser.add_argument("--skew", type=float, default=1.3, help="Parameter Zipf produk (<= 1 = merata)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=SYNTH_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    paths = write_dataset(args.out, args.rows, args.products, args.formats, args.seed, args.chunk_rows,
+                          dup_rate=args.dup_rate, null_rate=args.null_rate, skew=args.skew)
+    for kind, files in paths.items():
+        for path in files.values():
+            print(f"{kind}: {path} ({os.path.getsize(path) / 1024 ** 2:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
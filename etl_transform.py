@@ -0,0 +1,500 @@
+# --- HELPER TRANSFORM UNTUK simple_etl.py ---
+# Operasi Transform yang tidak harus lewat Spark.
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from etl_extract import link_file
+from etl_spark import to_arrow
+
+UNION_BATCH_ROWS = 100000
+
+
+# --- UNION (SCHEMA DISAMAKAN BERDASARKAN NAMA KOLOM) ---
+def unify_type(types):
+    # Aturan penyatuan tipe yang eksplisit: sama -> tetap, int campur ->
+    # int64, angka campur -> float64, tanggal campur -> timestamp,
+    # selain itu -> string. Kolom yang seluruhnya kosong (null) diabaikan;
+    # large_string (kolom string[pyarrow] mode compact) dianggap sama dengan string.
+    types = [_plain(t) for t in types if not pa.types.is_null(t)]
+    if not types:
+        return pa.string()
+    if all(t.equals(types[0]) for t in types):
+        return types[0]
+    if all(pa.types.is_integer(t) for t in types):
+        return pa.int64()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    if all(pa.types.is_temporal(t) and not pa.types.is_time(t) for t in types):
+        return pa.timestamp("ns")
+    return pa.string()
+
+
+def _plain(t):
+    return pa.string() if pa.types.is_large_string(t) else t
+
+
+def _dataset_of(data):
+    # Path Parquet atau pyarrow dataset (mis. spill Arrow IPC dari DataStore)
+    return ds.dataset(data, format="parquet") if isinstance(data, str) else data
+
+
+def _schema_of(data):
+    if isinstance(data, str):
+        return ds.dataset(data, format="parquet").schema.remove_metadata()
+    if isinstance(data, ds.Dataset):
+        # Spill DataStore menyimpan index pandas non-default sebagai kolom; tidak ikut di-union
+        schema = data.schema
+        index = [c for c in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)]
+        return pa.schema([f for f in schema if f.name not in index])
+    return _pandas_schema(data)
+
+
+def _pandas_schema(df):
+    try:
+        return pa.Schema.from_pandas(df, preserve_index=False).remove_metadata()
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return to_arrow(df)[0].schema
+
+
+def union_schema(schemas):
+    # Kolom diurutkan sesuai kemunculan pertama; return (schema, daftar cast)
+    names = []
+    for schema in schemas:
+        names += [n for n in schema.names if n not in names]
+    fields, casts = [], []
+    for name in names:
+        types = [s.field(name).type for s in schemas if name in s.names]
+        target = unify_type(types)
+        fields.append(pa.field(name, target))
+        changed = sorted({str(t) for t in types if not _plain(t).equals(target) and not pa.types.is_null(t)})
+        if changed:
+            casts.append(f"{name}: {', '.join(changed)} -> {target}")
+    return pa.schema(fields), casts
+
+
+def conform(table, schema):
+    # Samakan tabel/batch ke schema gabungan: cast tipe, kolom yang tidak ada diisi null
+    arrays = []
+    for field in schema:
+        if field.name in table.column_names:
+            arrays.append(table.column(field.name).cast(field.type, safe=False))
+        else:
+            arrays.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _batches(data, batch_rows):
+    if isinstance(data, (str, ds.Dataset)):
+        for batch in _dataset_of(data).to_batches(batch_size=batch_rows):
+            yield pa.Table.from_batches([batch])
+        return
+    for start in range(0, len(data), batch_rows):
+        yield to_arrow(data.iloc[start:start + batch_rows])[0]
+
+
+def union_to_parquet(members, out_dir, batch_rows=UNION_BATCH_ROWS):
+    # members: list data (pandas DataFrame, path Parquet atau pyarrow dataset).
+    # Hasilnya folder dataset Parquet (satu part per anggota). Anggota berupa
+    # file yang schema-nya sudah sama cukup di-hard-link (tanpa baca/tulis
+    # data); sisanya ditulis ulang per batch. Return (jumlah_baris, daftar cast, jumlah anggota di-link).
+    schemas = [_schema_of(d) for d in members]
+    schema, casts = union_schema(schemas)
+    os.makedirs(out_dir)
+    rows, linked = 0, 0
+    for i, (data, member_schema) in enumerate(zip(members, schemas)):
+        part = os.path.join(out_dir, f"part-{i:05d}.parquet")
+        if isinstance(data, str) and os.path.isfile(data) and member_schema.equals(schema):
+            link_file(data, part)
+            rows += pq.ParquetFile(part).metadata.num_rows
+            linked += 1
+            continue
+        with pq.ParquetWriter(part, schema) as writer:
+            for table in _batches(data, batch_rows):
+                writer.write_table(conform(table, schema))
+                rows += table.num_rows
+    return rows, casts, linked
+
+
+# --- JOIN: PILIH STRATEGI SESUAI UKURAN ---
+# Tabel dimensi kecil (mis. master_produk) di-broadcast ke semua executor,
+# atau kalau kedua sisi kecil & sudah di pandas, join hash di memory saja.
+BROADCAST_MAX_MB = int(os.environ.get("ETL_BROADCAST_MAX_MB", "10"))
+PANDAS_JOIN_MAX_MB = int(os.environ.get("ETL_PANDAS_JOIN_MAX_MB", "256"))
+JOIN_SUFFIX = "_right"
+
+
+def choose_join_strategy(left_bytes, right_bytes, both_pandas, how="left"):
+    # left_bytes/right_bytes None = ukuran tidak diketahui (plan Spark)
+    if both_pandas and left_bytes is not None and right_bytes is not None \
+            and left_bytes + right_bytes <= PANDAS_JOIN_MAX_MB * 1024 ** 2:
+        return "pandas-hash"
+    # Spark mengabaikan hint broadcast sisi kanan untuk right/full outer join
+    if how in ("right", "outer", "full"):
+        return "shuffle"
+    if right_bytes is not None and right_bytes <= BROADCAST_MAX_MB * 1024 ** 2:
+        return "broadcast"
+    return "shuffle"
+
+
+def join_pandas(left, right, left_on, right_on, how):
+    # Kunci dengan nama sama digabung jadi satu kolom; kolom lain yang
+    # namanya bentrok diberi akhiran _right
+    if left_on == right_on:
+        return left.merge(right, on=left_on, how=how, suffixes=("", JOIN_SUFFIX))
+    return left.merge(right, left_on=left_on, right_on=right_on, how=how, suffixes=("", JOIN_SUFFIX))
+
+
+def join_spark(left, right, left_on, right_on, how, broadcast_right=False):
+    from pyspark.sql.functions import broadcast
+
+    same_key = left_on == right_on
+    for c in set(left.columns) & set(right.columns):
+        if same_key and c == left_on:
+            continue
+        right = right.withColumnRenamed(c, c + JOIN_SUFFIX)
+        if c == right_on:
+            right_on = c + JOIN_SUFFIX
+    if broadcast_right:
+        right = broadcast(right)
+    if same_key:
+        return left.join(right, on=left_on, how=how)
+    return left.join(right, left[left_on] == right[right_on], how=how)
+
+
+# --- HAPUS DUPLIKAT (SATU PASS) ---
+# Kolom bantu: jumlah baris duplikat yang dibuang untuk tiap baris yang
+# disimpan. Dijumlahkan dari hasil, jadi tidak perlu count() sebelum/sesudah.
+DUP_COUNT_COL = "__dup_removed"
+
+
+def dedup_spark(df, subset=None, keep="first", order_by=None):
+    # Window per kunci: baris ke-1 (urut order_by, atau urutan data) disimpan.
+    # Hasil masih punya kolom DUP_COUNT_COL; buang setelah dijumlahkan.
+    from pyspark.sql import Window
+    from pyspark.sql import functions as F
+
+    keys = list(subset) if subset else list(df.columns)
+    if order_by:
+        order = F.col(order_by)
+    else:
+        df = df.withColumn("__row_id", F.monotonically_increasing_id())
+        order = F.col("__row_id")
+    order = order.asc_nulls_last() if keep == "first" else order.desc_nulls_last()
+    by_key = Window.partitionBy(*keys)
+    result = (df.withColumn("__rn", F.row_number().over(by_key.orderBy(order)))
+                .withColumn(DUP_COUNT_COL, F.count(F.lit(1)).over(by_key) - 1)
+                .filter(F.col("__rn") == 1)
+                .drop("__rn", "__row_id"))
+    return result
+
+
+def dedup_pandas(df, subset=None, keep="first", order_by=None):
+    # Return (hasil, jumlah_baris_terhapus)
+    subset = list(subset) if subset else None
+    if order_by:
+        # Sama dengan versi Spark: urut naik (first) / turun (last), null di akhir
+        data = df.sort_values(order_by, ascending=(keep == "first"), kind="stable", na_position="last")
+        keep = "first"
+    else:
+        data = df
+    mask = data.duplicated(subset=subset, keep=keep)
+    result = data[~mask]
+    if order_by:
+        result = result.sort_index()
+    return result.reset_index(drop=True), int(mask.sum())
+
+
+# --- PILIH ENGINE PER OPERASI (PANDAS / SPARK) ---
+# Data kecil-menengah yang sudah di pandas diolah langsung di pandas (tanpa
+# konversi ke Spark & collect balik). Versi pandas di bawah mengikuti
+# semantik Spark, jadi hasilnya sama dengan jalur Spark.
+PANDAS_MAX_MB = int(os.environ.get("ETL_PANDAS_MAX_MB", "512"))
+PANDAS_ONLY_OPS = {"transpose"}
+# Cast mengikuti aturan cast Spark (ANSI), tidak ada padanan pandas yang persis sama
+SPARK_ONLY_OPS = {"cast"}
+
+
+def column_kinds(df):
+    # Jenis tiap kolom: text / int / float / bool / mixed / empty / other.
+    # "mixed" = kolom object campuran yang di Spark dipaksa jadi string.
+    kinds = {}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_bool_dtype(s):
+            kinds[c] = "bool"
+        elif pd.api.types.is_integer_dtype(s):
+            kinds[c] = "int"
+        elif pd.api.types.is_float_dtype(s):
+            kinds[c] = "float"
+        elif s.dtype == object or isinstance(s.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+            # Category (mode compact): jenisnya mengikuti isi kategorinya
+            values = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s
+            inferred = pd.api.types.infer_dtype(values, skipna=True)
+            kinds[c] = {"string": "text", "empty": "empty"}.get(
+                inferred, "mixed" if inferred.startswith("mixed") and inferred != "mixed-integer-float" else "other")
+        else:
+            kinds[c] = "other"
+    return kinds
+
+
+def schema_kinds(schema):
+    # column_kinds() dari schema Arrow/Parquet (dataset di disk), tanpa membaca
+    # datanya. Satu kolom file selalu satu tipe, jadi tidak ada "mixed".
+    kinds = {}
+    for field in schema:
+        if field.name.startswith("__index_level_"):
+            continue
+        t = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+        if pa.types.is_boolean(t):
+            kinds[field.name] = "bool"
+        elif pa.types.is_integer(t):
+            kinds[field.name] = "int"
+        elif pa.types.is_floating(t):
+            kinds[field.name] = "float"
+        elif pa.types.is_string(t) or pa.types.is_large_string(t):
+            kinds[field.name] = "text"
+        elif pa.types.is_null(t):
+            kinds[field.name] = "empty"
+        else:
+            kinds[field.name] = "other"
+    return kinds
+
+
+def _pandas_can(op, kinds, columns):
+    if "mixed" in kinds.values():
+        return False
+    if op in ("replace", "bulk_replace", "filter", "split"):
+        return all(kinds.get(c) == "text" for c in columns)
+    if op == "merge":
+        return all(kinds.get(c) in ("text", "int", "empty") for c in columns)
+    return True
+
+
+def choose_engine(op, kinds, nbytes, columns=()):
+    # Return "pandas" atau "spark", dari ukuran data (store.size_of) & jenis
+    # kolom: column_kinds() untuk data di memory, schema_kinds() untuk file di
+    # disk (cukup dihitung sekali per versi data); None = plan Spark lazy.
+    if op in PANDAS_ONLY_OPS:
+        return "pandas"
+    if op in SPARK_ONLY_OPS or kinds is None:
+        return "spark"
+    if nbytes is None or nbytes > PANDAS_MAX_MB * 1024 ** 2:
+        return "spark"
+    return "pandas" if _pandas_can(op, kinds, columns) else "spark"
+
+
+def _with_category(s, value):
+    # Kolom category hanya bisa diisi nilai yang sudah jadi kategorinya
+    if isinstance(s.dtype, pd.CategoricalDtype) and value not in s.cat.categories:
+        return s.cat.add_categories([value])
+    return s
+
+
+def _fill_value(kind, value, column):
+    # Nilai isi per kolom (diketik sebagai teks) dikonversi sesuai jenis kolom
+    if kind in ("int", "float"):
+        try:
+            return int(value) if kind == "int" else float(value)
+        except ValueError:
+            raise ValueError(f"Kolom {column}: nilai '{value}' bukan angka") from None
+    if kind == "bool":
+        return str(value).strip().lower() in ("true", "1", "ya", "yes")
+    if kind in ("text", "empty"):
+        return str(value)
+    raise ValueError(f"Kolom {column}: tipe {kind} tidak bisa diisi lewat Fill Blank")
+
+
+def fill_values(kinds, value, per_column=None):
+    # {kolom: nilai}: teks -> value, angka -> 0, lalu nilai khusus per kolom.
+    # Dipakai versi pandas & Spark, jadi semua kolom diisi dalam satu fillna.
+    fills = {c: value for c, k in kinds.items() if k == "text"}
+    fills.update({c: 0 for c, k in kinds.items() if k in ("int", "float")})
+    for c, v in (per_column or {}).items():
+        fills[c] = _fill_value(kinds.get(c), v, c)
+    return fills
+
+
+def fill_blank_pandas(df, value, kinds=None, per_column=None):
+    # = df.na.fill({kolom: nilai}) dari fill_values()
+    kinds = column_kinds(df) if kinds is None else kinds
+    fills = fill_values(kinds, value, per_column)
+    # Kolom category tanpa null dilewati (fillna tetap menolak nilai di luar kategorinya)
+    cats = [c for c in fills if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    for c in cats:
+        if not df[c].hasnans:
+            del fills[c]
+    if not fills:
+        return df
+    added = {c: _with_category(df[c], fills[c]) for c in cats if c in fills}
+    return (df.assign(**added) if added else df).fillna(fills)
+
+
+def replace_pandas(df, column, old, new):
+    # = when(col == old, new).otherwise(col); null tetap null. Di string[pyarrow]
+    # perbandingan dengan null hasilnya <NA>, jadi mask diisi False dulu.
+    s = _with_category(df[column], new)
+    hit = s.eq(old).fillna(False).astype(bool)
+    return df.assign(**{column: s.where(~hit, new)})
+
+
+def _java_replacement(repl):
+    # Replacement ala Spark/Java -> Python: $1 -> \g<1>, \x -> x (literal)
+    def convert(m):
+        if m.group(1) is not None:
+            return "\\g<" + m.group(1) + ">"
+        return m.group(2).replace("\\", "\\\\")
+    return re.sub(r"\$(\d+)|\\(.)", convert, repl)
+
+
+def _clean_values(values, mapping, rules):
+    # mapping persis dulu (tidak berantai), lalu regex berurutan
+    values = pd.Series(values, dtype=object)
+    if mapping:
+        hit = values.isin(list(mapping))
+        values = values.where(~hit, values.map(mapping))
+    for pattern, repl in rules:
+        values = values.str.replace(pattern, _java_replacement(repl), regex=True)
+    return values.to_numpy(dtype=object)
+
+
+def mapping_from_table(table):
+    # Tabel mapping (upload / diketik): kolom 1 = nilai lama, kolom 2 = nilai baru.
+    # Baris dengan nilai lama kosong dilewati; baris terakhir menang jika dobel.
+    if table is None or table.shape[1] < 2:
+        return {}
+    pairs = table.iloc[:, :2].astype(object).where(table.iloc[:, :2].notna(), "")
+    return {str(old): str(new) for old, new in pairs.itertuples(index=False) if str(old) != ""}
+
+
+def check_rules(rules):
+    # Pola regex dicek sebelum dijalankan (sintaks Python; Spark memakai regex Java)
+    for pattern, _ in rules:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Pola regex tidak valid '{pattern}': {e}") from None
+    return list(rules)
+
+
+def bulk_replace_pandas(df, columns, mapping=None, rules=()):
+    # = bulk_replace_spark. Aturan dijalankan sekali per nilai unik
+    # (factorize / kategori), lalu hasilnya disebar ke semua baris, jadi
+    # 50 ejaan region cukup 50 lookup, bukan 50 pass atas seluruh data.
+    mapping, rules = dict(mapping or {}), list(rules)
+    out = {}
+    for c in columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes, uniques = s.cat.codes.to_numpy(), s.cat.categories
+        else:
+            codes, uniques = pd.factorize(s)
+        cleaned = _clean_values(uniques, mapping, rules)
+        values = pd.Series(cleaned.take(np.where(codes < 0, 0, codes)) if len(cleaned) else s.to_numpy(dtype=object),
+                           index=s.index).mask(codes < 0, s)
+        out[c] = values if s.dtype == object else values.astype(s.dtype if isinstance(s.dtype, pd.StringDtype) else "category")
+    return df.assign(**out) if out else df
+
+
+def filter_contains_pandas(df, column, value):
+    # = col.contains(value): null tidak ikut, pencarian teks biasa (bukan regex)
+    return df[df[column].str.contains(value, regex=False, na=False)].reset_index(drop=True)
+
+
+def split_pandas(df, column, delimiter):
+    # = split(col, delimiter) (delimiter diperlakukan sebagai regex), ambil 2 bagian pertama
+    parts = df[column].str.split(delimiter, regex=True)
+    return df.assign(**{f"{column}_1": parts.str[0], f"{column}_2": parts.str[1]})
+
+
+def merge_columns_pandas(df, columns, separator, new_column):
+    # = concat_ws(separator, *columns): null dilewati, semua null -> ""
+    merged = None
+    for c in columns:
+        s = df[c].astype("string")
+        merged = s if merged is None else (merged + separator + s).fillna(merged).fillna(s)
+    return df.assign(**{new_column: merged.fillna("").astype(object)})
+
+
+# --- VERSI SPARK (DIPAKAI HALAMAN TRANSFORM & RUNNER RECIPE) ---
+CAST_TYPES = ["String", "Integer", "Float", "Date"]
+
+
+def spark_kinds(df):
+    # Jenis kolom dari schema Spark, sama seperti column_kinds() untuk pandas
+    from pyspark.sql import types as T
+    kinds = {}
+    for f in df.schema.fields:
+        t = f.dataType
+        if isinstance(t, T.StringType):
+            kinds[f.name] = "text"
+        elif isinstance(t, T.BooleanType):
+            kinds[f.name] = "bool"
+        elif isinstance(t, T.IntegralType):
+            kinds[f.name] = "int"
+        elif isinstance(t, T.FractionalType):
+            kinds[f.name] = "float"
+        else:
+            kinds[f.name] = "other"
+    return kinds
+
+
+def fill_blank_spark(df, value, per_column=None):
+    # Satu na.fill(dict): teks -> value, angka -> 0, nilai khusus per kolom
+    fills = fill_values(spark_kinds(df), value, per_column)
+    return df.na.fill(fills) if fills else df
+
+
+def replace_spark(df, column, old, new):
+    from pyspark.sql.functions import col, when
+    return df.withColumn(column, when(col(column) == old, new).otherwise(col(column)))
+
+
+def bulk_replace_spark(df, columns, mapping=None, rules=()):
+    # Satu projection untuk semua kolom: coalesce(mapping[col], col) lalu
+    # regexp_replace berurutan. Kolom non-teks dibandingkan sebagai string.
+    from pyspark.sql import functions as F
+    mapping, rules = dict(mapping or {}), list(rules)
+    lookup = F.create_map(*[F.lit(x) for kv in mapping.items() for x in kv]) if mapping else None
+    exprs = {}
+    for c in columns:
+        e = F.col(c).cast("string")
+        if lookup is not None:
+            # try_element_at: kunci yang tidak ada -> null (element_at gagal di mode ANSI)
+            e = F.coalesce(F.try_element_at(lookup, e), e)
+        for pattern, repl in rules:
+            e = F.regexp_replace(e, pattern, repl)
+        exprs[c] = e
+    return df.withColumns(exprs) if exprs else df
+
+
+def filter_contains_spark(df, column, value):
+    from pyspark.sql.functions import col
+    return df.filter(col(column).contains(value))
+
+
+def split_spark(df, column, delimiter):
+    # get(): null jika bagian kedua tidak ada, juga di mode ANSI
+    from pyspark.sql.functions import col, get, split
+    parts = split(col(column), delimiter)
+    return df.withColumn(f"{column}_1", get(parts, 0)).withColumn(f"{column}_2", get(parts, 1))
+
+
+def merge_columns_spark(df, columns, separator, new_column):
+    from pyspark.sql.functions import col, concat_ws
+    return df.withColumn(new_column, concat_ws(separator, *[col(c) for c in columns]))
+
+
+def cast_spark(df, column, target):
+    from pyspark.sql.functions import col
+    from pyspark.sql.types import DateType, FloatType, IntegerType, StringType
+
+    spark_type = {"String": StringType(), "Integer": IntegerType(),
+                  "Float": FloatType(), "Date": DateType()}[target]
+    return df.withColumn(column, col(column).cast(spark_type))
@@ -1,29 +1,133 @@
+import time
+_script_start = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import io
-from sqlalchemy import create_engine, inspect
-import findspark
-findspark.init()
-import sys
-from pyspark import SparkContext
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, when, split, concat_ws, lit, regexp_replace
-from pyspark.sql.types import StringType, IntegerType, FloatType, DateType
+import os
+from sqlalchemy import inspect
+# pyspark/findspark TIDAK di-import di sini: baru dimuat saat Transform/HDFS dipakai
+from etl_spark import is_spark, to_spark, to_pandas, commit, build_spark, tune_spark, estimate_bytes, spark_loaded
+from etl_store import DataStore, DEFAULT_BUDGET_MB
+from etl_db import make_engine, mysql_dsn, load_tables, read_incremental, watermark_state, read_pushdown, DB_CHUNK_ROWS
+from etl_load import push_table, write_spark, write_parquet_file, low_cardinality_columns, SPARK_FORMATS, PARQUET_CODECS, ROW_GROUP_ROWS, DOWNLOAD_MAX_MB, LOAD_MODES, LOAD_CHUNK_ROWS, LOAD_BATCH_ROWS, LOAD_WORKERS
+from etl_transform import (union_to_parquet, choose_join_strategy, join_pandas, join_spark, dedup_spark, dedup_pandas, DUP_COUNT_COL,
+                           choose_engine, column_kinds, schema_kinds, fill_blank_pandas, replace_pandas, filter_contains_pandas, split_pandas, merge_columns_pandas,
+                           fill_blank_spark, replace_spark, filter_contains_spark, split_spark, merge_columns_spark, cast_spark, CAST_TYPES,
+                           bulk_replace_pandas, bulk_replace_spark, mapping_from_table, check_rules)
+from etl_extract import parse_parallel, content_key, link_file, scan_parquet, with_compact, ParseCache, STREAM_CSV_MIN_MB
+from etl_recipe import Recipe, LOAD_OPS
+from etl_metrics import StepLog
+
+# Copy-on-write pandas: hasil Transform berbagi kolom yang tidak diubah dengan
+# versi sebelumnya (history Undo di DataStore), bukan menyalin seluruh DataFrame
+pd.set_option("mode.copy_on_write", True)
+
+# Target waktu render halaman Extract (tanpa Spark), dicek di bawah halaman Extract
+EXTRACT_RENDER_TARGET_MS = 300
 
 # --- KONFIGURASI HALAMAN ---
 
 st.set_page_config(page_title="Proyek Big Data - ETL", layout="wide", page_icon="🚀")
 st.title("abcd")
 
+# --- SPARK SESSION (SATU UNTUK SEMUA RERUN) ---
+# Profil (master, driver memory) diambil dari ukuran data saat pertama dibuat,
+# shuffle partition disesuaikan ulang tiap kali dipakai.
+@st.cache_resource(show_spinner="Menyalakan Spark...")
+def get_spark(_nbytes=None):
+    return build_spark(_nbytes)
+
+# Cache hasil parsing upload, dipakai bersama oleh semua sesi di server
+@st.cache_resource
+def get_parse_cache():
+    return ParseCache()
+
+# Engine + connection pool per DSN, tidak dibuat ulang tiap klik
+@st.cache_resource
+def get_engine(dsn, local_infile=False):
+    return make_engine(dsn, local_infile=local_infile)
+
+# Baca ulang dataset dari sumber aslinya (MySQL / file Parquet) dengan
+# filter & kolom yang di-push ke sumber, bukan difilter setelah semua di-load
+def reload_from_source(key, source):
+    store = st.session_state.data_store
+    if source["kind"] == "sql":
+        df = read_pushdown(get_engine(source["dsn"]), source["table"], source["columns"], source["filters"])
+        store[key] = df
+    else:
+        # Hasil scan ditulis ke file Parquet baru, file itu jadi sumber berikutnya
+        path = store.new_path(".parquet")
+        scan_parquet(source["path"], path, source["columns"], source["filters"])
+        store.add_file(key, path)
+        source = {"kind": "parquet", "path": path, "columns": None, "filters": []}
+    store.meta(key)["source"] = source
+
+# Data pandas untuk target Load; plan lazy dieksekusi sekali lalu disimpan
+# (materialize) agar tidak diulang. File Parquet di disk dibaca apa adanya.
+def load_frame(key):
+    store = st.session_state.data_store
+    data = store[key]
+    if is_spark(data):
+        data = to_pandas(data)
+        store.materialize(key, data)
+    return data
+
+def engine_badge(engine):
+    return f"⚙️ Engine: **{engine}**"
+
+def spark_for(data):
+    nbytes = estimate_bytes(data)
+    spark = get_spark(nbytes)
+    tune_spark(spark, nbytes)
+    return spark
+
 # --- SESSION STATE (DATA STORE) ---
-# Kita gunakan Dictionary untuk menyimpan BANYAK dataframe sekaligus
+# Kita gunakan DataStore (seperti Dictionary) untuk menyimpan BANYAK dataframe sekaligus
 # Format: {'nama_file_atau_tabel': dataframe_objek}
+# Jika melebihi batas RAM, data yang lama tidak dipakai di-spill ke disk (Arrow IPC)
 if 'data_store' not in st.session_state:
-    st.session_state.data_store = {}
+    st.session_state.data_store = DataStore(DEFAULT_BUDGET_MB)
 
 if 'active_key' not in st.session_state:
     st.session_state.active_key = None
 
+# Mode lazy: hasil Transform disimpan sebagai plan Spark (belum di-collect)
+if 'lazy_mode' not in st.session_state:
+    st.session_state.lazy_mode = False
+
+# Rekaman semua aksi Extract/Transform/Load (dijalankan ulang lewat etl_recipe.py)
+if 'recipe' not in st.session_state:
+    st.session_state.recipe = Recipe()
+
+# Langkah recipe yang di-Undo per dataset, dipasang lagi saat Redo
+if 'redo_steps' not in st.session_state:
+    st.session_state.redo_steps = {}
+
+def record(op, dataset=None, **params):
+    st.session_state.recipe.record(op, dataset, **params)
+    # Versi data yang baru ditulis op ini diberi label operasinya (riwayat
+    # versi & Undo); Load tidak mengubah data
+    if op not in LOAD_OPS and st.session_state.data_store.set_label(dataset, op):
+        st.session_state.redo_steps.pop(dataset, None)
+
+# Timeline per langkah: waktu, baris, konversi vs compute, job Spark, RSS
+if 'step_log' not in st.session_state:
+    st.session_state.step_log = StepLog()
+
+def track(stage, action, dataset=None):
+    return st.session_state.step_log.step(stage, action, dataset, st.session_state.data_store)
+
+# Mode compact: jenis kolom disimpan di meta dataset (dipasang lagi oleh
+# DataStore setelah data lewat Spark), laporan memory untuk halaman Extract.
+# Dipanggil SEBELUM data disimpan, supaya dtype dataset lama tidak ikut terpasang.
+def set_compact(name, compacted):
+    meta = st.session_state.data_store.meta(name)
+    meta.pop("dtypes", None)
+    meta.pop("compact", None)
+    if compacted:
+        meta["dtypes"] = compacted["dtypes"]
+        meta["compact"] = {k: v for k, v in compacted.items() if k != "dtypes"}
+
 # --- SIDEBAR: DATA MANAGER ---
 st.sidebar.title("🗄️ Data Manager")
 st.sidebar.info("Data yang sudah di-load akan muncul di sini.")
@@ -46,6 +150,49 @@ if st.session_state.data_store:
 else:
     st.sidebar.warning("Belum ada data.")
 
+# Batas RAM data store & status tiap dataset (RAM / disk)
+with st.sidebar.expander("💾 Memori Data Store"):
+    budget_mb = st.number_input("Batas RAM (MB)", min_value=64, value=DEFAULT_BUDGET_MB, step=256, key="store_budget_mb")
+    store = st.session_state.data_store
+    store.set_budget_mb(budget_mb)
+    st.caption(f"Di RAM: {store.resident_bytes() / 1024**2:.1f} MB | Di disk: {store.spilled_bytes() / 1024**2:.1f} MB"
+               f" | Versi lama (Undo): {store.history_bytes() / 1024**2:.1f} MB")
+    if len(store):
+        st.dataframe(pd.DataFrame(store.stats()), hide_index=True)
+
+st.sidebar.toggle("⚡ Mode Lazy (Spark Plan)", key="lazy_mode",
+                  help="Transform tidak langsung di-collect ke Pandas. Data baru dieksekusi saat preview (terbatas) atau saat Load.")
+
+st.sidebar.caption("⚙️ Spark: aktif" if spark_loaded() else "⚙️ Spark: belum dinyalakan (lazy)")
+
+# Recipe: download lalu jalankan tanpa Streamlit (mis. dijadwalkan tiap malam)
+with st.sidebar.expander(f"📜 Recipe Pipeline ({len(st.session_state.recipe)} langkah)"):
+    recipe = st.session_state.recipe
+    if len(recipe):
+        st.download_button("Download YAML", recipe.dumps("yaml"), "recipe.yaml")
+        st.download_button("Download JSON", recipe.dumps("json"), "recipe.json")
+        st.code("ETL_DB_PASSWORD=... python etl_recipe.py recipe.yaml --input-dir data/ --engine spark", language="bash")
+        if st.button("Reset Recipe"):
+            recipe.clear()
+            st.rerun()
+    else:
+        st.caption("Belum ada aksi yang direkam.")
+
+with st.sidebar.expander(f"⏱️ Timeline Langkah ({len(st.session_state.step_log)})"):
+    step_log = st.session_state.step_log
+    if len(step_log):
+        timeline = step_log.frame()
+        slowest = timeline.loc[timeline["seconds"].idxmax()]
+        st.caption(f"Paling lambat: {slowest['stage']} / {slowest['action']} ({slowest['seconds']:.2f} s)")
+        st.dataframe(timeline.iloc[::-1], hide_index=True)
+        st.download_button("Download CSV", step_log.to_csv(), "timeline.csv")
+        st.download_button("Download JSON", step_log.to_json(), "timeline.json")
+        if st.button("Reset Timeline"):
+            step_log.clear()
+            st.rerun()
+    else:
+        st.caption("Belum ada langkah yang dijalankan.")
+
 menu = st.sidebar.radio("Tahapan ETL:", ["1. Extract (Multi Source)", "2. Transform (Olah)", "3. Load (Simpan)"])
 
 # ==========================================
@@ -54,29 +201,108 @@ menu = st.sidebar.radio("Tahapan ETL:", ["1. Extract (Multi Source)", "2. Transf
 if menu == "1. Extract (Multi Source)":
     st.header("1. Extract: Ambil Banyak Sumber Data")
     
+    compact_mode = st.checkbox("🗜️ Mode Compact (dtype hemat memory)", value=False, key="compact_mode",
+                               help="Teks berulang -> category, teks lain -> string[pyarrow], bilangan bulat -> int8/16/32, "
+                                    "teks tanggal -> datetime. Berlaku untuk upload (kecuali CSV yang di-stream) & tabel DB.")
+
     tab1, tab2, tab3 = st.tabs(["📁 Multi-Upload File", "🗄️ Database Tables", "➕ Union/Gabung Data"])
     
     # --- TAB 1: MULTI FILE UPLOAD ---
     with tab1:
         st.write("Upload banyak file sekaligus (Contoh: Data Jan, Data Feb, Data Mar).")
         uploaded_files = st.file_uploader("Upload File (CSV/Excel/Parquet)", type=['csv', 'xlsx', 'parquet'], accept_multiple_files=True)
+        stream_all = st.checkbox("Streaming CSV ke disk (Parquet)", value=False,
+                                 help=f"CSV > {STREAM_CSV_MIN_MB} MB selalu di-stream per blok ke disk agar RAM tetap kecil.")
         
         if uploaded_files:
-            for uploaded_file in uploaded_files:
-                # Cek agar tidak load ulang jika sudah ada
-                if uploaded_file.name not in st.session_state.data_store:
-                    try:
-                        if uploaded_file.name.endswith('.csv'):
-                            df = pd.read_csv(uploaded_file)
-                        elif uploaded_file.name.endswith('.xlsx'):
-                            df = pd.read_excel(uploaded_file)
-                        elif uploaded_file.name.endswith('.parquet'):
-                            df = pd.read_parquet(uploaded_file)
-                        
-                        st.session_state.data_store[uploaded_file.name] = df
-                        st.toast(f"Berhasil load: {uploaded_file.name}")
-                    except Exception as e:
-                        st.error(f"Gagal load {uploaded_file.name}: {e}")
+            store = st.session_state.data_store
+            cache = get_parse_cache()
+            before = set(store.keys())
+
+            def store_cached(name, hit):
+                kind, value, info = hit
+                if kind == "file":
+                    path = link_file(value, store.new_path(".parquet"))
+                    store.add_file(name, path)
+                    store.meta(name)["source"] = {"kind": "parquet", "path": path, "columns": None, "filters": []}
+                else:
+                    set_compact(name, info.get("compact"))
+                    store[name] = value.copy(deep=False)
+
+            with track("Extract", "upload") as rec:
+                # Cek agar tidak load ulang jika sudah ada; isi file yang sama
+                # (nama apa pun) diambil dari cache tanpa parsing ulang
+                tasks, keys, aliases = [], {}, []
+                for uploaded_file in uploaded_files:
+                    if uploaded_file.name not in store:
+                        # CSV besar: baca per blok, langsung tulis ke Parquet di disk
+                        if uploaded_file.name.endswith('.parquet'):
+                            # Parquet tidak perlu di-parse (dan tidak di-cache): simpan file-nya, dibaca saat dipakai
+                            path = store.new_path(".parquet")
+                            with open(path, "wb") as f:
+                                f.write(uploaded_file.getbuffer())
+                            store.add_file(uploaded_file.name, path)
+                            store.meta(uploaded_file.name)["source"] = {"kind": "parquet", "path": path, "columns": None, "filters": []}
+                            st.toast(f"Berhasil load: {uploaded_file.name}")
+                            continue
+                        stream = uploaded_file.name.endswith('.csv') and (stream_all or uploaded_file.size > STREAM_CSV_MIN_MB * 1024**2)
+                        key = content_key(uploaded_file, uploaded_file.name, stream, compact_mode)
+                        if key in keys.values():
+                            aliases.append((uploaded_file.name, key))
+                            continue
+                        hit = cache.get(key)
+                        if hit:
+                            store_cached(uploaded_file.name, hit)
+                            st.toast(f"Dari cache: {uploaded_file.name}")
+                            continue
+                        keys[uploaded_file.name] = key
+                        tasks.append((uploaded_file.name, uploaded_file, store.new_path(".parquet") if stream else None))
+
+                # Semua file di-parse paralel, hasil dimasukkan ke store sesuai urutan selesai
+                bars = {name: st.progress(0.0, text=f"Streaming {name}...") for name, _, path in tasks if path}
+                def show_progress(progress):
+                    for name, frac in progress.items():
+                        bars[name].progress(frac, text=f"Streaming {name}...")
+
+                stream_paths = {name: path for name, _, path in tasks}
+                for name, df, info, err in parse_parallel(tasks, on_tick=show_progress, compact=compact_mode):
+                    if name in bars:
+                        bars[name].empty()
+                    if err is not None:
+                        st.error(f"Gagal load {name}: {err}")
+                    elif df is None:
+                        store.add_file(name, stream_paths[name])
+                        store.meta(name)["source"] = {"kind": "parquet", "path": stream_paths[name], "columns": None, "filters": []}
+                        cache.put_file(keys[name], stream_paths[name], info)
+                        if info["as_string"]:
+                            st.info(f"{name}: kolom {', '.join(info['as_string'])} dibaca sebagai String.")
+                        st.toast(f"Berhasil stream: {name} ({info['rows']} baris)")
+                    else:
+                        set_compact(name, info.get("compact"))
+                        store[name] = df
+                        cache.put_frame(keys[name], df, info)
+                        st.toast(f"Berhasil load: {name}")
+
+                # File dengan isi sama yang di-upload bersamaan cukup di-parse sekali
+                for name, key in aliases:
+                    hit = cache.get(key)
+                    src = next(n for n, k in keys.items() if k == key)
+                    if hit:
+                        store_cached(name, hit)
+                    elif src in store:
+                        store.meta(name).update((k, v) for k, v in store.meta(src).items() if k in ("dtypes", "compact"))
+                        store[name] = store[src]
+
+                for uploaded_file in uploaded_files:
+                    if uploaded_file.name in store and uploaded_file.name not in before:
+                        record("read_file", uploaded_file.name, path=uploaded_file.name, compact=compact_mode)
+                added = [n for n in store.keys() if n not in before]
+                rec["dataset"] = ", ".join(added)
+                rec["rows_out"] = sum(store.summary(n)["rows"] for n in added)
+                rec["skip"] = not added
+
+            stats = cache.stats()
+            st.caption(f"🗃️ Cache parsing: {stats['hits']} hit / {stats['misses']} miss | {stats['entries']} file, {stats['MB']} MB")
             
             # Refresh halaman agar sidebar update
             if st.button("Selesai Upload & Refresh"):
@@ -98,8 +324,8 @@ if menu == "1. Extract (Multi Source)":
 
         if st.button("Connect & Scan Tables"):
             try:
-                db_str = f'mysql+mysqlconnector://{user}:{password}@{host}/{dbname}'
-                engine = create_engine(db_str)
+                db_str = mysql_dsn(user, password, host, dbname)
+                engine = get_engine(db_str)
                 inspector = inspect(engine)
                 tables = inspector.get_table_names()
                 st.session_state.db_tables_list = tables
@@ -111,16 +337,72 @@ if menu == "1. Extract (Multi Source)":
         if st.session_state.db_tables_list:
             selected_tables = st.multiselect("Pilih Tabel untuk di-load:", st.session_state.db_tables_list)
             
+            # Opsi pembacaan paralel per rentang nilai (seperti partitionColumn di Spark JDBC)
+            c_p1, c_p2, c_p3 = st.columns(3)
+            part_col = c_p1.text_input("Kolom Partisi (angka/tanggal, opsional)", "", help="Tabel tanpa kolom ini dibaca biasa per chunk.")
+            num_parts = c_p2.number_input("Jumlah Partisi", min_value=1, max_value=64, value=4)
+            chunk_rows = c_p3.number_input("Baris per Chunk", min_value=1000, value=DB_CHUNK_ROWS, step=10000)
+            
+            # Mode incremental: tabel yang sudah di-load hanya mengambil baris baru
+            # (watermark_col >= nilai tertinggi terakhir, tanpa baris yang sudah ada), lalu di-append
+            c_w1, c_w2 = st.columns(2)
+            incremental = c_w1.checkbox("Mode Incremental (Watermark)", value=False)
+            wm_col = c_w2.text_input("Kolom Watermark (id/tanggal yang selalu naik)", "Date", disabled=not incremental)
+            
             if st.button("Load Tabel Terpilih"):
-                db_str = f'mysql+mysqlconnector://{user}:{password}@{host}/{dbname}'
-                engine = create_engine(db_str)
+                with track("Extract", "db: " + ", ".join(selected_tables)) as rec:
+                    db_str = mysql_dsn(user, password, host, dbname)
+                    engine = get_engine(db_str)
+                    store = st.session_state.data_store
+                    failed = False
                 
-                for tbl in selected_tables:
-                    if tbl not in st.session_state.data_store:
-                        df = pd.read_sql(tbl, engine)
-                        st.session_state.data_store[tbl] = df
-                        st.toast(f"Tabel {tbl} berhasil di-load!")
-                st.rerun()
+                    if incremental:
+                        for tbl in [t for t in selected_tables if t in store]:
+                            state = store.incremental_state(tbl)
+                            if state is None or state[0] != wm_col:
+                                st.warning(f"{tbl}: belum ada watermark untuk kolom '{wm_col}' atau data sudah di-Transform, "
+                                           "hapus data & load ulang dulu.")
+                                continue
+                            try:
+                                new_df, watermark, seen = read_incremental(engine, tbl, wm_col, state[1], state[2],
+                                                                           int(chunk_rows))
+                            except Exception as e:
+                                st.error(f"Gagal refresh tabel {tbl}: {e}")
+                                failed = True
+                                continue
+                            if new_df is None:
+                                st.toast(f"Tabel {tbl}: tidak ada data baru.")
+                            else:
+                                # Watermark baru dipasang setelah append, supaya versi
+                                # sebelum refresh (Undo) menyimpan watermark lamanya
+                                store.append(tbl, new_df)
+                                store.set_label(tbl, "refresh")
+                                store.meta(tbl).update(watermark=watermark, watermark_seen=seen)
+                                st.toast(f"Tabel {tbl}: +{len(new_df)} baris baru.")
+                
+                    # Semua tabel (dan partisinya) dibaca bersamaan
+                    todo = [tbl for tbl in selected_tables if tbl not in store]
+                    with st.spinner(f"Membaca {len(todo)} tabel..."):
+                        for tbl, df, err in load_tables(engine, todo, part_col.strip() or None, int(num_parts), int(chunk_rows)):
+                            if err is not None:
+                                st.error(f"Gagal load tabel {tbl}: {err}")
+                                failed = True
+                                continue
+                            df, compacted = with_compact(df, compact_mode)
+                            set_compact(tbl, compacted)
+                            store[tbl] = df
+                            store.meta(tbl)["source"] = {"kind": "sql", "dsn": db_str, "table": tbl, "columns": None, "filters": []}
+                            record("read_table", tbl, dsn=db_str, table=tbl, partition_column=part_col.strip() or None,
+                                   num_partitions=int(num_parts), chunk_rows=int(chunk_rows), compact=compact_mode)
+                            if incremental and wm_col in df.columns:
+                                watermark, seen = watermark_state(engine, tbl, df, wm_col)
+                                store.meta(tbl).update(watermark_col=wm_col, watermark=watermark, watermark_seen=seen)
+                            st.toast(f"Tabel {tbl} berhasil di-load!")
+                    # Pesan error tetap tampil jika ada tabel yang gagal
+                    if failed:
+                        rec["error"] = "sebagian tabel gagal di-load"
+                    else:
+                        st.rerun()
 
     # --- TAB 3: UNION (GABUNG DATA) ---
     with tab3:
@@ -132,17 +414,47 @@ if menu == "1. Extract (Multi Source)":
         new_name = st.text_input("Nama Data Gabungan Baru", "Data_Gabungan_All")
         
         if st.button("Proses Union"):
-            if len(union_candidates) < 2:
-                st.error("Pilih minimal 2 data.")
-            else:
-                try:
-                    dfs_to_merge = [st.session_state.data_store[k] for k in union_candidates]
-                    merged_df = pd.concat(dfs_to_merge, ignore_index=True)
-                    st.session_state.data_store[new_name] = merged_df
-                    st.success(f"Berhasil menggabungkan data! Total baris: {len(merged_df)}")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Gagal gabung: {e}")
+            with track("Extract", "union", new_name) as rec:
+                if len(union_candidates) < 2:
+                    st.error("Pilih minimal 2 data.")
+                else:
+                    try:
+                        # Union berdasarkan nama kolom dengan penyatuan tipe eksplisit.
+                        # Hasilnya dataset Parquet di disk: anggota berupa file dengan schema
+                        # yang sama hanya di-link, jadi tidak ada salinan data di RAM.
+                        store = st.session_state.data_store
+                        # Spill Arrow IPC dibaca per batch langsung dari disk, bukan ke pandas
+                        members = [store.parquet_path(k) or store.arrow_dataset(k) or to_pandas(store[k])
+                                   for k in union_candidates]
+                        out_dir = store.new_path(".parquet")
+                        with st.spinner("Menggabungkan data..."):
+                            rows, casts, linked = union_to_parquet(members, out_dir)
+                        store.add_file(new_name, out_dir)
+                        record("union", new_name, members=union_candidates)
+                        store.meta(new_name)["source"] = {"kind": "parquet", "path": out_dir, "columns": None, "filters": []}
+                        st.success(f"Berhasil menggabungkan data! Total baris: {rows} ({linked} file tanpa salin ulang)")
+                        if casts:
+                            st.warning("Penyesuaian tipe kolom: " + " | ".join(casts))
+                        else:
+                            st.rerun()
+                    except Exception as e:
+                        st.error(f"Gagal gabung: {e}")
+                        rec["error"] = str(e)
+
+    # Laporan mode compact: memory sebelum/sesudah per dataset
+    store = st.session_state.data_store
+    reports = [(k, store.meta(k)["compact"]) for k in store if "compact" in store.meta(k)]
+    if reports:
+        with st.expander(f"🗜️ Laporan Mode Compact ({len(reports)} data)"):
+            st.dataframe(pd.DataFrame([{
+                "data": k, "sebelum (MB)": r["before_mb"], "sesudah (MB)": r["after_mb"],
+                "hemat": f"{1 - r['after_mb'] / r['before_mb']:.0%}" if r["before_mb"] else "-",
+                "kolom": "; ".join(f"{c}: {chg}" for c, chg in r["columns"].items()),
+            } for k, r in reports]), hide_index=True)
+
+    render_ms = (time.perf_counter() - _script_start) * 1000
+    st.caption(f"⏱️ Render halaman Extract: {render_ms:.0f} ms (target {EXTRACT_RENDER_TARGET_MS} ms)"
+               + ("" if render_ms <= EXTRACT_RENDER_TARGET_MS else " ⚠️ melebihi target"))
 
 # ==========================================
 # 2. TRANSFORM (PADA DATA AKTIF)
@@ -153,25 +465,96 @@ elif menu == "2. Transform (Olah)":
     if not active_k:
         st.warning("⚠️ Belum ada data aktif dipilih di Sidebar. Silakan pilih data dulu.")
     else:
-        st.header(f"2. Transform: Mengedit '{active_k}' (Spark Engine)")
+        st.header(f"2. Transform: Mengedit '{active_k}'")
+        
+        # Halaman cukup memakai metadata & preview yang di-cache di store: data
+        # penuh baru dibaca / dikonversi ke Spark saat sebuah operasi dijalankan
+        store = st.session_state.data_store
+        info = store.summary(active_k)
+        columns = info["columns"]
+        # Dataset Parquet di disk dibaca Spark langsung dari file
+        parquet_src = store.parquet_path(active_k) if store.is_spilled(active_k) else None
         
-        # Initialize Spark
-        spark = SparkSession.builder.appName("StreamlitETL").getOrCreate()
+        loaded = {}
+        def active_data():
+            # Pandas DF atau plan Spark lazy (dibaca ulang dari disk jika di-spill)
+            if "data" not in loaded:
+                loaded["data"] = store[active_k]
+            return loaded["data"]
         
-        # Get Pandas DF
-        pdf = st.session_state.data_store[active_k]
+        def active_spark():
+            # Convert to Spark DF via Arrow (plan lazy dipakai langsung tanpa konversi)
+            if "df" not in loaded:
+                if parquet_src:
+                    nbytes_src = store.size_of(active_k)
+                    spark = get_spark(nbytes_src)
+                    tune_spark(spark, nbytes_src)
+                    loaded["df"] = spark.read.parquet(parquet_src)
+                else:
+                    # Initialize Spark (cached resource, disetel sesuai ukuran data)
+                    spark = spark_for(active_data())
+                    loaded["df"], coerced = to_spark(spark, active_data())
+                    if coerced:
+                        st.session_state.flash_warning = f"Kolom berikut tidak bisa dikonversi langsung dan diubah ke String: {', '.join(map(str, coerced))}"
+                loaded["spark"] = spark
+            return loaded["df"]
         
-        # Convert to Spark DF
-        try:
-            df = spark.createDataFrame(pdf)
-        except Exception as e:
-            st.warning(f"Gagal convert ke Spark secara langsung, mencoba convert semua ke String dulu: {e}")
-            df = spark.createDataFrame(pdf.astype(str))
+        # Engine per operasi dari ukuran data: pandas untuk data kecil-menengah (di
+        # memory atau di disk), Spark untuk data besar / plan lazy. Jenis kolom file
+        # di disk dari schema-nya (tanpa baca data), di-cache per versi data.
+        nbytes = store.size_of(active_k)
+        def data_kinds():
+            schema = store.file_schema(active_k)
+            return schema_kinds(schema) if schema is not None else column_kinds(active_data())
+        kinds = None if info["lazy"] else store.cached(active_k, "kinds", data_kinds)
+        def pick(op, cols=()):
+            return choose_engine(op, kinds, nbytes, cols)
 
+        # Pesan hasil operasi sebelum st.rerun()
+        if st.session_state.get("flash_warning"):
+            st.warning(st.session_state.pop("flash_warning"))
+        if st.session_state.get("flash"):
+            st.success(st.session_state.pop("flash"))
+        
         # --- PREVIEW DATA ---
         with st.expander("🔍 Lihat Data Saat Ini", expanded=True):
-            st.dataframe(pdf.head(5))
-            st.caption(f"Total Baris: {pdf.shape[0]} | Total Kolom: {pdf.shape[1]}")
+            st.dataframe(info["preview"])
+            if info["rows"] is None:
+                st.caption(f"Total Kolom: {len(columns)} | Plan Spark lazy (baris belum dihitung, dieksekusi saat Load)")
+            else:
+                st.caption(f"Total Baris: {info['rows']} | Total Kolom: {len(columns)}")
+        
+        # --- UNDO / REDO ---
+        # Versi lama disimpan di DataStore; kolom yang tidak diubah dibagi antar versi
+        c_u1, c_u2, _ = st.columns([1, 1, 4])
+        if c_u1.button("↩️ Undo", disabled=not store.can_undo(active_k)):
+            with track("Transform", "undo", active_k):
+                undone = store.undo(active_k)
+                step = st.session_state.recipe.pop(active_k, undone["label"])
+                st.session_state.redo_steps.setdefault(active_k, []).append(step)
+                st.session_state.flash = f"Undo: {undone['label'] or 'perubahan terakhir'}"
+                st.rerun()
+        if c_u2.button("↪️ Redo", disabled=not store.can_redo(active_k)):
+            with track("Transform", "redo", active_k):
+                redone = store.redo(active_k)
+                steps = st.session_state.redo_steps.get(active_k)
+                st.session_state.recipe.push(steps.pop() if steps else None)
+                st.session_state.flash = f"Redo: {redone['label'] or 'perubahan'}"
+                st.rerun()
+        
+        versions = store.history(active_k)
+        with st.expander(f"🕘 Riwayat Versi ({len(versions) - 1} versi lama)"):
+            st.dataframe(pd.DataFrame(versions), hide_index=True)
+            diff = store.diff(active_k)
+            if diff:
+                parts = [f"baris {diff['rows'][0]} -> {diff['rows'][1]}"]
+                if diff["added"]:
+                    parts.append("kolom baru: " + ", ".join(map(str, diff["added"])))
+                if diff["removed"]:
+                    parts.append("kolom dihapus: " + ", ".join(map(str, diff["removed"])))
+                if diff["rewritten"] is not None:
+                    parts.append("kolom berubah: " + (", ".join(map(str, diff["rewritten"])) or "-"))
+                st.caption(f"Dibanding versi sebelumnya ({diff['label'] or '-'}): " + " | ".join(parts))
         
         # --- MENU TRANSFORMASI ---
         t1, t2, t3, t4 = st.tabs([
@@ -183,172 +566,321 @@ elif menu == "2. Transform (Olah)":
         
         # --- TAB 1: DATA CLEANING ---
         with t1:
-            st.subheader("Data Cleaning (Spark)")
+            st.subheader("Data Cleaning")
             col_c1, col_c2 = st.columns(2)
             
             with col_c1:
                 st.markdown("**1. Fill The Blank**")
                 fill_val = st.text_input("Isi data teks kosong dengan:", "Unknown")
+                # Nilai khusus per kolom (kolom angka lain tetap diisi 0); semua diisi dalam satu pass
+                fill_table = st.data_editor(pd.DataFrame({"kolom": pd.Series(dtype=str), "nilai": pd.Series(dtype=str)}),
+                                            num_rows="dynamic", hide_index=True, key="fill_per_col",
+                                            column_config={"kolom": st.column_config.SelectboxColumn("kolom", options=columns)})
+                per_column = mapping_from_table(fill_table)
+                engine = pick("fill")
+                st.caption(engine_badge(engine))
                 if st.button("Isi Data Kosong"):
-                    # Spark fillna
-                    df = df.na.fill(fill_val) # Fills strings
-                    df = df.na.fill(0)        # Fills numbers
-                    
-                    st.session_state.data_store[active_k] = df.toPandas()
-                    st.success("Data kosong berhasil diisi.")
-                    st.rerun()
+                    with track("Transform", f"fill ({engine})", active_k) as rec:
+                        try:
+                            if engine == "pandas":
+                                store[active_k] = fill_blank_pandas(active_data(), fill_val, kinds, per_column)
+                            else:
+                                # Spark fillna (satu na.fill dengan nilai per kolom)
+                                df = fill_blank_spark(active_spark(), fill_val, per_column)
+                                store[active_k] = commit(df, st.session_state.lazy_mode)
+                            record("fill", active_k, value=fill_val, per_column=per_column)
+                            st.session_state.flash = f"Data kosong berhasil diisi. [{engine}]"
+                            st.rerun()
+                        except ValueError as e:
+                            st.error(f"Gagal mengisi data kosong: {e}")
+                            rec["error"] = str(e)
             
             with col_c2:
                 st.markdown("**2. Remove Duplicates**")
+                dup_keys = st.multiselect("Kolom kunci (kosong = semua kolom):", columns, key="dup_keys")
+                dup_keep = st.radio("Simpan baris:", ["first", "last"], horizontal=True, key="dup_keep")
+                dup_order = st.selectbox("Urutkan berdasarkan:", ["(urutan data)"] + columns, key="dup_order")
+                engine = pick("dedup")
+                st.caption(engine_badge(engine))
                 if st.button("Hapus Duplikat"):
-                    before = df.count()
-                    df = df.dropDuplicates()
-                    after = df.count()
-                    
-                    st.session_state.data_store[active_k] = df.toPandas()
-                    st.success(f"Berhasil menghapus {before - after} baris duplikat.")
-                    st.rerun()
+                    with track("Transform", f"dedup ({engine})", active_k) as rec:
+                        order_by = None if dup_order == "(urutan data)" else dup_order
+                        if engine == "pandas":
+                            store[active_k], removed = dedup_pandas(active_data(), dup_keys, dup_keep, order_by)
+                            st.session_state.flash = f"Berhasil menghapus {removed} baris duplikat. [pandas]"
+                        else:
+                            # Satu job Spark: window per kunci, jumlah baris terhapus ikut dihitung di pass yang sama
+                            deduped = dedup_spark(active_spark(), dup_keys, dup_keep, order_by)
+                            if st.session_state.lazy_mode:
+                                store[active_k] = deduped.drop(DUP_COUNT_COL)
+                                st.session_state.flash = "Duplikat dihapus (lazy: jumlah baris terhapus dihitung saat data dieksekusi). [spark]"
+                            else:
+                                result = to_pandas(deduped)
+                                removed = int(result.pop(DUP_COUNT_COL).sum())
+                                store[active_k] = result
+                                st.session_state.flash = f"Berhasil menghapus {removed} baris duplikat. [spark]"
+                        record("dedup", active_k, subset=dup_keys, keep=dup_keep, order_by=order_by)
+                        st.rerun()
 
         # --- TAB 2: DATA MANIPULATION ---
         with t2:
-            st.subheader("Data Manipulation (Spark)")
+            st.subheader("Data Manipulation")
             
             # A. REPLACE
             with st.expander("A. Replace Value (Ganti Nilai)"):
                 c_rep1, c_rep2, c_rep3 = st.columns(3)
-                rep_col = c_rep1.selectbox("Pilih Kolom:", df.columns, key="rep_col")
+                rep_col = c_rep1.selectbox("Pilih Kolom:", columns, key="rep_col")
                 old_val = c_rep2.text_input("Nilai Lama")
                 new_val = c_rep3.text_input("Nilai Baru")
+                engine = pick("replace", [rep_col])
+                st.caption(engine_badge(engine))
                 
                 if st.button("Ganti Nilai"):
-                    # Spark replace
-                    df = df.withColumn(rep_col, when(col(rep_col) == old_val, new_val).otherwise(col(rep_col)))
-                    st.session_state.data_store[active_k] = df.toPandas()
-                    st.success(f"Mengganti '{old_val}' menjadi '{new_val}'")
-                    st.rerun()
+                    with track("Transform", f"replace ({engine})", active_k) as rec:
+                        if engine == "pandas":
+                            store[active_k] = replace_pandas(active_data(), rep_col, old_val, new_val)
+                        else:
+                            # Spark replace
+                            df = replace_spark(active_spark(), rep_col, old_val, new_val)
+                            store[active_k] = commit(df, st.session_state.lazy_mode)
+                        record("replace", active_k, column=rep_col, old=old_val, new=new_val)
+                        st.session_state.flash = f"Mengganti '{old_val}' menjadi '{new_val}' [{engine}]"
+                        st.rerun()
+
+            # A2. BULK REPLACE: tabel mapping + aturan regex, banyak kolom sekaligus
+            with st.expander("A2. Bulk Replace (Mapping & Regex)"):
+                bulk_cols = st.multiselect("Kolom target:", columns, key="bulk_cols")
+                map_file = st.file_uploader("Upload tabel mapping (CSV/Excel: kolom 1 = nilai lama, kolom 2 = nilai baru)",
+                                            type=["csv", "xlsx"], key="bulk_map_file")
+                c_b1, c_b2 = st.columns(2)
+                c_b1.caption("Mapping tambahan (nilai persis):")
+                map_table = c_b1.data_editor(pd.DataFrame({"lama": pd.Series(dtype=str), "baru": pd.Series(dtype=str)}),
+                                             num_rows="dynamic", hide_index=True, key="bulk_map")
+                c_b2.caption("Aturan regex (berurutan, setelah mapping; grup: $1):")
+                rule_table = c_b2.data_editor(pd.DataFrame({"pola": pd.Series(dtype=str), "ganti": pd.Series(dtype=str)}),
+                                              num_rows="dynamic", hide_index=True, key="bulk_rules")
+                engine = pick("bulk_replace", bulk_cols)
+                st.caption(engine_badge(engine))
+
+                if st.button("Jalankan Bulk Replace"):
+                    with track("Transform", f"bulk_replace ({engine})", active_k) as rec:
+                        try:
+                            mapping = {}
+                            if map_file is not None:
+                                read = pd.read_csv if map_file.name.endswith(".csv") else pd.read_excel
+                                mapping = mapping_from_table(read(map_file, dtype=str, keep_default_na=False))
+                            mapping.update(mapping_from_table(map_table))
+                            rules = check_rules([(p, r) for p, r in mapping_from_table(rule_table).items()])
+                            if not bulk_cols or not (mapping or rules):
+                                raise ValueError("Pilih kolom target dan isi minimal satu mapping / aturan regex.")
+                            if engine == "pandas":
+                                store[active_k] = bulk_replace_pandas(active_data(), bulk_cols, mapping, rules)
+                            else:
+                                df = bulk_replace_spark(active_spark(), bulk_cols, mapping, rules)
+                                store[active_k] = commit(df, st.session_state.lazy_mode)
+                            record("bulk_replace", active_k, columns=bulk_cols, mapping=mapping, rules=[list(r) for r in rules])
+                            st.session_state.flash = (f"{len(mapping)} mapping & {len(rules)} aturan regex diterapkan "
+                                                      f"ke {len(bulk_cols)} kolom. [{engine}]")
+                            st.rerun()
+                        except ValueError as e:
+                            st.error(f"Gagal bulk replace: {e}")
+                            rec["error"] = str(e)
 
+            # Sumber asli data aktif (MySQL / Parquet) jika belum diubah Transform lain
+            source = st.session_state.data_store.meta(active_k).get("source")
+            
             # B. FILTER
             with st.expander("B. Filter Data (Saring)"):
                 c_fil1, c_fil2 = st.columns(2)
-                fil_col = c_fil1.selectbox("Filter Berdasarkan Kolom:", df.columns, key="fil_col")
+                fil_col = c_fil1.selectbox("Filter Berdasarkan Kolom:", columns, key="fil_col")
                 fil_val = c_fil2.text_input("Nilai yang dicari (Contains):")
+                push_fil = st.checkbox("Pushdown ke sumber (WHERE di database / scan Parquet)", value=bool(source), disabled=not source, key="push_fil")
+                engine = "sumber" if push_fil and source else pick("filter", [fil_col])
+                st.caption(engine_badge(engine))
                 
                 if st.button("Terapkan Filter"):
-                    # Spark filter contains
-                    df = df.filter(col(fil_col).contains(fil_val))
-                    st.session_state.data_store[active_k] = df.toPandas()
-                    st.success(f"Filter diterapkan.")
-                    st.rerun()
+                    with track("Transform", f"filter ({engine})", active_k) as rec:
+                        if engine == "sumber":
+                            # Hanya baris yang cocok yang dibaca dari sumber
+                            reload_from_source(active_k, dict(source, filters=source["filters"] + [(fil_col, fil_val)]))
+                        elif engine == "pandas":
+                            store[active_k] = filter_contains_pandas(active_data(), fil_col, fil_val)
+                        else:
+                            # Spark filter contains
+                            df = filter_contains_spark(active_spark(), fil_col, fil_val)
+                            store[active_k] = commit(df, st.session_state.lazy_mode)
+                        record("filter", active_k, column=fil_col, value=fil_val, pushdown=engine == "sumber")
+                        st.session_state.flash = f"Filter diterapkan. [{engine}]"
+                        st.rerun()
+
+            # PILIH KOLOM (PROJECTION)
+            with st.expander("Pilih Kolom (Buang Kolom Tidak Perlu)"):
+                keep_cols = st.multiselect("Kolom yang disimpan:", columns, default=columns, key="keep_cols")
+                push_sel = st.checkbox("Pushdown ke sumber (SELECT kolom / projection Parquet)", value=bool(source), disabled=not source, key="push_sel")
+                engine = "sumber" if push_sel and source else pick("select", keep_cols)
+                st.caption(engine_badge(engine))
+                
+                if st.button("Terapkan Pilihan Kolom"):
+                    with track("Transform", f"select ({engine})", active_k) as rec:
+                        if not keep_cols:
+                            st.error("Pilih minimal 1 kolom.")
+                        else:
+                            if engine == "sumber":
+                                reload_from_source(active_k, dict(source, columns=keep_cols))
+                            elif engine == "pandas":
+                                store[active_k] = active_data()[keep_cols]
+                            else:
+                                df = active_spark().select(*keep_cols)
+                                store[active_k] = commit(df, st.session_state.lazy_mode)
+                            record("select", active_k, columns=keep_cols, pushdown=engine == "sumber")
+                            st.session_state.flash = f"{len(keep_cols)} kolom disimpan. [{engine}]"
+                            st.rerun()
 
             # C. TRANSPOSE
             with st.expander("C. Transpose (Putar Baris <> Kolom)"):
                 st.warning("⚠️ Transpose tidak didukung secara native di Spark untuk UI ini (kembali ke Pandas).")
+                st.caption(engine_badge(pick("transpose")))
                 if st.button("Lakukan Transpose"):
-                    pdf = df.toPandas()
-                    pdf = pdf.T.reset_index()
-                    st.session_state.data_store[active_k] = pdf
-                    st.success("Transpose berhasil (via Pandas).")
-                    st.rerun()
+                    with track("Transform", "transpose (pandas)", active_k) as rec:
+                        store[active_k] = to_pandas(active_data()).T.reset_index()
+                        record("transpose", active_k)
+                        st.session_state.flash = "Transpose berhasil. [pandas]"
+                        st.rerun()
 
         # --- TAB 3: COLUMN OPERATIONS ---
         with t3:
-            st.subheader("Column Operations (Spark)")
+            st.subheader("Column Operations")
             
             # A. SPLIT COLUMN
             with st.expander("A. Split Column (Pecah Kolom)"):
-                split_col = st.selectbox("Pilih Kolom untuk Dipecah:", df.columns, key="split_col")
+                split_col = st.selectbox("Pilih Kolom untuk Dipecah:", columns, key="split_col")
                 delimiter = st.text_input("Pemisah (Delimiter)", " ", help="Contoh: koma (,), spasi ( ), strip (-)")
+                engine = pick("split", [split_col])
+                st.caption(engine_badge(engine))
                 
                 if st.button("Pecah Kolom"):
-                    try:
-                        # Simple split implementation: take first 2 parts
-                        split_col_expr = split(col(split_col), delimiter)
-                        df = df.withColumn(f"{split_col}_1", split_col_expr.getItem(0)) \
-                               .withColumn(f"{split_col}_2", split_col_expr.getItem(1))
-                        
-                        st.session_state.data_store[active_k] = df.toPandas()
-                        st.success(f"Kolom {split_col} berhasil dipecah (Max 2 bagian).")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Gagal split: {e}")
+                    with track("Transform", f"split ({engine})", active_k) as rec:
+                        try:
+                            if engine == "pandas":
+                                store[active_k] = split_pandas(active_data(), split_col, delimiter)
+                            else:
+                                # Simple split implementation: take first 2 parts
+                                df = split_spark(active_spark(), split_col, delimiter)
+                                store[active_k] = commit(df, st.session_state.lazy_mode)
+                            record("split", active_k, column=split_col, delimiter=delimiter)
+                            st.session_state.flash = f"Kolom {split_col} berhasil dipecah (Max 2 bagian). [{engine}]"
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Gagal split: {e}")
+                            rec["error"] = str(e)
 
             # B. MERGE COLUMN
             with st.expander("B. Merge Column (Gabung Kolom)"):
-                merge_cols = st.multiselect("Pilih Beberapa Kolom:", df.columns)
+                merge_cols = st.multiselect("Pilih Beberapa Kolom:", columns)
                 separator = st.text_input("Pemisah Gabungan", " ", key="merge_sep")
                 new_col_name = st.text_input("Nama Kolom Baru", "Gabungan_Baru")
+                engine = pick("merge", merge_cols)
+                st.caption(engine_badge(engine))
                 
                 if st.button("Gabung Kolom"):
-                    if not merge_cols:
-                        st.error("Pilih minimal 2 kolom.")
-                    else:
-                        df = df.withColumn(new_col_name, concat_ws(separator, *[col(c) for c in merge_cols]))
-                        st.session_state.data_store[active_k] = df.toPandas()
-                        st.success(f"Kolom baru '{new_col_name}' berhasil dibuat.")
-                        st.rerun()
+                    with track("Transform", f"merge ({engine})", active_k) as rec:
+                        if not merge_cols:
+                            st.error("Pilih minimal 2 kolom.")
+                        else:
+                            if engine == "pandas":
+                                store[active_k] = merge_columns_pandas(active_data(), merge_cols, separator, new_col_name)
+                            else:
+                                df = merge_columns_spark(active_spark(), merge_cols, separator, new_col_name)
+                                store[active_k] = commit(df, st.session_state.lazy_mode)
+                            record("merge", active_k, columns=merge_cols, separator=separator, new_column=new_col_name)
+                            st.session_state.flash = f"Kolom baru '{new_col_name}' berhasil dibuat. [{engine}]"
+                            st.rerun()
 
             # C. DATA TYPE FORMATTING
             with st.expander("C. Change Data Type (Ubah Tipe Data)"):
                 c_type1, c_type2 = st.columns(2)
-                type_col = c_type1.selectbox("Pilih Kolom:", df.columns, key="type_col")
-                target_type = c_type2.selectbox("Ubah ke Tipe:", ["String", "Integer", "Float", "Date"])
+                type_col = c_type1.selectbox("Pilih Kolom:", columns, key="type_col")
+                target_type = c_type2.selectbox("Ubah ke Tipe:", CAST_TYPES)
+                st.caption(engine_badge(pick("cast")))
                 
                 if st.button("Ubah Tipe Data"):
-                    try:
-                        if target_type == "String":
-                            df = df.withColumn(type_col, col(type_col).cast(StringType()))
-                        elif target_type == "Integer":
-                            df = df.withColumn(type_col, col(type_col).cast(IntegerType()))
-                        elif target_type == "Float":
-                            df = df.withColumn(type_col, col(type_col).cast(FloatType()))
-                        elif target_type == "Date":
-                            df = df.withColumn(type_col, col(type_col).cast(DateType()))
-                        
-                        st.session_state.data_store[active_k] = df.toPandas()
-                        st.success(f"Kolom {type_col} berhasil diubah ke {target_type}.")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Gagal mengubah tipe: {e}")
+                    with track("Transform", "cast (spark)", active_k) as rec:
+                        try:
+                            df = cast_spark(active_spark(), type_col, target_type)
+                            # Tipe baru dipilih user: dtype compact kolom ini tidak dipasang lagi
+                            store.meta(active_k).get("dtypes", {}).pop(type_col, None)
+                            store[active_k] = commit(df, st.session_state.lazy_mode)
+                            record("cast", active_k, column=type_col, target=target_type)
+                            st.session_state.flash = f"Kolom {type_col} berhasil diubah ke {target_type}. [spark]"
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Gagal mengubah tipe: {e}")
+                            rec["error"] = str(e)
 
         # --- TAB 4: RELATIONAL (JOIN) ---
         with t4:
-            st.subheader("Relational Operations (Join Tables - Spark)")
+            st.subheader("Relational Operations (Join Tables)")
             
-            other_keys = [k for k in st.session_state.data_store.keys() if k != active_k]
+            other_keys = [k for k in store.keys() if k != active_k]
             
             if not other_keys:
                 st.warning("⚠️ Anda butuh minimal 2 data.")
             else:
                 c_j1, c_j2 = st.columns(2)
                 right_table_name = c_j1.selectbox("Pilih Tabel Pasangan (Right):", other_keys)
-                join_type = c_j2.selectbox("Jenis Join:", ["left", "inner", "right", "outer"]) # Spark supports these
+                join_type = c_j2.selectbox("Jenis Join:", ["left", "inner", "right", "outer"]) # Spark & Pandas support these
                 
-                right_pdf = st.session_state.data_store[right_table_name]
-                try:
-                    right_df = spark.createDataFrame(right_pdf)
-                except:
-                    right_df = spark.createDataFrame(right_pdf.astype(str))
+                # Right table belum dikonversi ke Spark: cukup baca nama kolomnya
+                right_parquet = store.parquet_path(right_table_name) if store.is_spilled(right_table_name) else None
+                right_info = store.summary(right_table_name)
+                right_cols = right_info["columns"]
                 
                 c_j3, c_j4 = st.columns(2)
-                left_on = c_j3.selectbox(f"Kunci di {active_k} (Left):", df.columns)
-                right_on = c_j4.selectbox(f"Kunci di {right_table_name} (Right):", right_df.columns)
+                left_on = c_j3.selectbox(f"Kunci di {active_k} (Left):", columns)
+                right_on = c_j4.selectbox(f"Kunci di {right_table_name} (Right):", right_cols,
+                                          index=right_cols.index(left_on) if left_on in right_cols else 0)
+                
+                # Strategi: pandas hash join (semua kecil), broadcast (right kecil), atau shuffle join
+                # (ukuran dari store; plan Spark dari statistik plan, tanpa eksekusi)
+                left_bytes = None if info["lazy"] else store.size_of(active_k)
+                right_bytes = estimate_bytes(store[right_table_name]) if right_info["lazy"] else store.size_of(right_table_name)
+                both_pandas = not info["lazy"] and not parquet_src and not right_info["lazy"] and not right_parquet
+                strategy = choose_join_strategy(left_bytes, right_bytes, both_pandas, join_type)
+                st.caption(f"Strategi join: **{strategy}** (right ≈ {(right_bytes or 0) / 1024**2:.1f} MB)")
                 
                 if st.button("Lakukan Join"):
-                    try:
-                        merged_df = df.join(right_df, df[left_on] == right_df[right_on], how=join_type)
-                        
-                        # Drop duplicate key column if names are same to avoid confusion in Pandas
-                        # Spark keeps both keys. Pandas merge usually merges them.
-                        # For simplicity, we just convert back.
+                    with track("Transform", f"join ({strategy})", active_k) as rec:
+                        try:
+                            t0 = time.perf_counter()
+                            if strategy == "pandas-hash":
+                                result = join_pandas(active_data(), store[right_table_name], left_on, right_on, join_type)
+                            else:
+                                left_df = active_spark()
+                                spark = loaded["spark"]
+                                if right_parquet:
+                                    right_df = spark.read.parquet(right_parquet)
+                                else:
+                                    right_df, right_coerced = to_spark(spark, store[right_table_name])
+                                    if right_coerced:
+                                        st.session_state.flash_warning = f"Kolom di {right_table_name} diubah ke String: {', '.join(map(str, right_coerced))}"
+                                # Kolom kunci dengan nama sama hanya muncul sekali di hasil
+                                merged_df = join_spark(left_df, right_df, left_on, right_on, join_type,
+                                                       broadcast_right=(strategy == "broadcast"))
+                                result = commit(merged_df, st.session_state.lazy_mode)
+                            elapsed = time.perf_counter() - t0
                         
-                        new_join_name = f"Join_{active_k}_{right_table_name}"
-                        st.session_state.data_store[new_join_name] = merged_df.toPandas()
+                            new_join_name = f"Join_{active_k}_{right_table_name}"
+                            store[new_join_name] = result
+                            rec["dataset"] = new_join_name
                         
-                        st.success(f"Join Berhasil! Data baru: {new_join_name}")
-                        st.session_state.active_key = new_join_name
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Gagal melakukan Join: {e}")
+                            record("join", new_join_name, left=active_k, right=right_table_name, left_on=left_on,
+                                   right_on=right_on, how=join_type)
+                            st.session_state.active_key = new_join_name
+                            st.session_state.flash = f"Join Berhasil! Data baru: {new_join_name} | strategi {strategy} | {elapsed:.2f} detik"
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Gagal melakukan Join: {e}")
+                            rec["error"] = str(e)
 
 # ==========================================
 # 3. LOAD (SIMPAN)
@@ -360,32 +892,90 @@ elif menu == "3. Load (Simpan)":
         st.warning("Pilih data di sidebar dulu.")
     else:
         st.header(f"3. Load: Simpan '{active_k}'")
-        df = st.session_state.data_store[active_k]
+        store = st.session_state.data_store
+        # Dataset Parquet di disk ditulis Spark langsung dari file-nya
+        parquet_src = store.parquet_path(active_k) if store.is_spilled(active_k) else None
+        # Form cukup pakai nama kolom dari summary; data di disk baru dibaca
+        # (dan plan lazy dieksekusi) di dalam tombol yang benar-benar menulis
+        columns = store.summary(active_k)["columns"]
+        resident = None if store.is_spilled(active_k) else store[active_k]
         
-        st.dataframe(df.head())
+        # Preview dari cache store (plan lazy tidak dieksekusi ulang tiap rerun)
+        st.dataframe(store.summary(active_k)["preview"])
         
         target = st.selectbox("Target Simpan:", ["Hadoop (Parquet)", "MySQL Database", "HDFS (Spark)"])
         
         if target == "Hadoop (Parquet)":
-            buffer = io.BytesIO()
-            df.to_parquet(buffer, index=False)
-            st.download_button("Download Parquet", buffer.getvalue(), "hasil.parquet")
+            # Ditulis per row group ke file sementara (bukan BytesIO + getvalue)
+            c_pq1, c_pq2 = st.columns(2)
+            codec = c_pq1.selectbox("Kompresi", PARQUET_CODECS)
+            rg_rows = c_pq1.number_input("Baris per Row Group", min_value=1000, value=ROW_GROUP_ROWS, step=50000)
+            # Saran kolom hanya dari data yang sudah di RAM (tanpa membaca disk)
+            dict_default = low_cardinality_columns(resident) if resident is not None and not is_spark(resident) else []
+            dict_cols = c_pq2.multiselect("Dictionary Encoding (kolom kardinalitas rendah)", columns, default=dict_default)
+            
+            if st.button("Siapkan File Parquet"):
+                with track("Load", "parquet", active_k) as rec:
+                    with st.spinner("Menulis Parquet..."):
+                        path = write_parquet_file(parquet_src or load_frame(active_k), store.new_path(".export.parquet"),
+                                                  codec, int(rg_rows), dict_cols)
+                    old = st.session_state.get("parquet_export")
+                    if old and os.path.exists(old["path"]):
+                        os.remove(old["path"])
+                    st.session_state.parquet_export = {"key": active_k, "path": path}
+                    record("to_parquet", active_k, path="hasil.parquet", compression=codec,
+                           row_group_rows=int(rg_rows), dictionary_cols=dict_cols)
+            
+            export = st.session_state.get("parquet_export")
+            if export and export["key"] == active_k and os.path.exists(export["path"]):
+                size_mb = os.path.getsize(export["path"]) / 1024**2
+                st.caption(f"Ukuran file: {size_mb:.1f} MB")
+                if size_mb <= DOWNLOAD_MAX_MB:
+                    # Streamlit membaca isi file ke memory saat tombol dirender
+                    with open(export["path"], "rb") as f:
+                        st.download_button("Download Parquet", f, "hasil.parquet")
+                else:
+                    st.info(f"File lebih dari {DOWNLOAD_MAX_MB} MB: tidak dikirim lewat browser "
+                            f"(akan dibaca utuh ke memory). Ambil langsung dari path berikut.")
+                    st.code(os.path.abspath(export["path"]), language=None)
             
         elif target == "HDFS (Spark)":
-            hdfs_url = st.text_input("HDFS URL", "hdfs://localhost:9000/user/royevan/uas")
+            hdfs_url = st.text_input("HDFS URL", "hdfs://localhost:9000/user/royevan/uas",
+                                     help="Bisa juga path lokal, contoh: file:///tmp/hasil_etl")
+            c_h1, c_h2, c_h3 = st.columns(3)
+            out_fmt = c_h1.selectbox("Format", list(SPARK_FORMATS))
+            compression = c_h1.selectbox("Kompresi", SPARK_FORMATS[out_fmt])
+            part_cols = c_h2.multiselect("Partition By (contoh: Region, Date)", columns)
+            write_mode = c_h2.selectbox("Mode Tulis", ["overwrite", "append"])
+            target_mb = c_h3.number_input("Target Ukuran File (MB)", min_value=1, value=128)
             if st.button("Save to HDFS"):
-                try:
-                    spark = SparkSession.builder.appName("StreamlitETL").getOrCreate()
-                    # Convert Pandas DF to Spark DF
-                    df_spark = df.astype(str)
-                    spark_df = spark.createDataFrame(df_spark)
+                with track("Load", f"hdfs ({out_fmt})", active_k) as rec:
+                    try:
+                        if parquet_src:
+                            nbytes = store.size_of(active_k)
+                            spark = get_spark(nbytes)
+                            tune_spark(spark, nbytes)
+                            spark_df, rows = spark.read.parquet(parquet_src), None
+                        else:
+                            df = store[active_k]
+                            spark = spark_for(df)
+                            nbytes, rows = estimate_bytes(df), (None if is_spark(df) else len(df))
+                            # Convert Pandas DF to Spark DF (via Arrow, tipe kolom dipertahankan)
+                            spark_df, coerced = to_spark(spark, df)
+                            if coerced:
+                                st.warning(f"Kolom diubah ke String: {', '.join(map(str, coerced))}")
                     
-                    # Save as Text File
-                    spark_df.rdd.map(lambda row: ",".join([str(x) for x in row])).saveAsTextFile(hdfs_url)
+                        # Writer native Spark (Parquet/ORC), bukan RDD text
+                        with st.spinner("Menulis dengan Spark..."):
+                            write_spark(spark_df, hdfs_url, out_fmt, compression, part_cols, write_mode,
+                                        int(target_mb), nbytes=nbytes, rows=rows)
                     
-                    st.success(f"Berhasil simpan ke HDFS: {hdfs_url}")
-                except Exception as e:
-                    st.error(f"Gagal simpan ke HDFS: {e}")
+                        record("to_spark", active_k, url=hdfs_url, format=out_fmt, compression=compression,
+                               partition_by=part_cols, mode=write_mode, target_file_mb=int(target_mb))
+                        st.success(f"Berhasil simpan ke HDFS: {hdfs_url}")
+                    except Exception as e:
+                        st.error(f"Gagal simpan ke HDFS: {e}")
+                        rec["error"] = str(e)
 
         elif target == "MySQL Database":
             c1, c2 = st.columns(2)
@@ -395,10 +985,31 @@ elif menu == "3. Load (Simpan)":
             d = c2.text_input("DB Name", key="ld")
             t = c2.text_input("Table Name", key="lt")
             
+            # Mode tulis & opsi throughput
+            c3, c4, c5 = st.columns(3)
+            load_mode = c3.selectbox("Mode", LOAD_MODES, help="replace: buat ulang tabel | append: tambah baris | upsert: update jika key sudah ada")
+            upsert_key = c3.selectbox("Key Upsert", columns, disabled=load_mode != "upsert")
+            chunk_rows = c4.number_input("Baris per Transaksi", min_value=1000, value=LOAD_CHUNK_ROWS, step=10000)
+            batch_rows = c4.number_input("Baris per INSERT", min_value=1, value=LOAD_BATCH_ROWS, step=500)
+            writers = c5.number_input("Koneksi Paralel", min_value=1, max_value=32, value=LOAD_WORKERS)
+            bulk_infile = c5.checkbox("Bulk LOAD DATA LOCAL INFILE", value=False, help="Butuh local_infile=ON di server MySQL.")
+            
             if st.button("Push to DB"):
-                try:
-                    eng = create_engine(f'mysql+mysqlconnector://{u}:{p}@{h}/{d}')
-                    df.to_sql(t, eng, if_exists='replace', index=False)
-                    st.success("Tersimpan di Database!")
-                except Exception as e:
-                    st.error(f"Error: {e}")
\ No newline at end of file
+                with track("Load", f"db ({load_mode})", active_k) as rec:
+                    try:
+                        eng = get_engine(mysql_dsn(u, p, h, d), local_infile=bulk_infile)
+                        with st.spinner("Menyiapkan data..."):
+                            df = load_frame(active_k)
+                        with st.spinner(f"Menulis {len(df)} baris ke {t}..."):
+                            stats = push_table(eng, df, t, load_mode, key=upsert_key if load_mode == "upsert" else None,
+                                               chunk_rows=int(chunk_rows), batch_rows=int(batch_rows),
+                                               workers=int(writers), bulk_infile=bulk_infile)
+                        record("to_sql", active_k, dsn=mysql_dsn(u, p, h, d), table=t, mode=load_mode,
+                               key=upsert_key if load_mode == "upsert" else None, chunk_rows=int(chunk_rows),
+                               batch_rows=int(batch_rows), workers=int(writers), bulk_infile=bulk_infile)
+                        st.success(f"Tersimpan di Database! {stats['rows']} baris dalam {stats['seconds']:.1f} detik "
+                                   f"({stats['rows_per_sec']:,.0f} baris/detik)")
+                        rec["rows_out"] = stats["rows"]
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+                        rec["error"] = str(e)
\ No newline at end of file
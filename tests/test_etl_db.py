@@ -0,0 +1,123 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from etl_db import load_tables, make_engine, read_incremental, read_query, table_queries, watermark_state
+from etl_store import DataStore
+
+ROWS = 1000
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # File SQLite (bukan :memory:) supaya thread pool load_tables melihat tabel yang sama
+    engine = make_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    start = dt.date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE sales (id INTEGER PRIMARY KEY, day DATE, region TEXT, amount FLOAT)"))
+        conn.execute(text("INSERT INTO sales VALUES (:id, :day, :region, :amount)"),
+                     [{"id": i, "day": (start + dt.timedelta(days=i % 90)).isoformat(),
+                       "region": "JKT" if i % 2 else "SBY", "amount": i * 1.5} for i in range(1, ROWS + 1)])
+        # NULL di kolom partisi ikut partisi pertama
+        conn.execute(text("INSERT INTO sales VALUES (:id, NULL, 'JKT', 0)"), [{"id": ROWS + 1}])
+    yield engine
+    engine.dispose()
+
+
+def _load(engine, partition_column, num_partitions):
+    results = list(load_tables(engine, ["sales"], partition_column, num_partitions, chunksize=100))
+    assert len(results) == 1
+    name, df, err = results[0]
+    assert name == "sales"
+    return df, err
+
+
+@pytest.mark.parametrize("column", ["id", "day"])
+def test_partitioned_read_matches_full_table(engine, column):
+    _, queries = table_queries(engine, "sales", column, 4)
+    assert len(queries) == 4
+
+    df, err = _load(engine, column, 4)
+    assert err is None
+    _, (whole,) = table_queries(engine, "sales")
+    full = read_query(engine, whole)
+    assert len(df) == ROWS + 1
+    assert df["id"].is_unique
+    pd.testing.assert_frame_equal(df.sort_values("id").reset_index(drop=True),
+                                  full.sort_values("id").reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize("column", ["id", "day"])
+def test_partitions_do_not_overlap(engine, column):
+    _, queries = table_queries(engine, "sales", column, 4)
+    counts = [len(read_query(engine, q)) for q in queries]
+    assert all(counts)
+    assert sum(counts) == ROWS + 1
+
+
+def test_string_partition_column_is_rejected(engine):
+    df, err = _load(engine, "region", 4)
+    assert df is None
+    assert isinstance(err, ValueError)
+    assert "region" in str(err)
+
+
+def test_unknown_partition_column_reads_whole_table(engine):
+    df, err = _load(engine, "missing", 4)
+    assert err is None
+    assert len(df) == ROWS + 1
+
+
+# --- incremental (watermark) ---
+def _insert(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO sales VALUES (:id, :day, 'JKT', 1)"), rows)
+
+
+def test_incremental_keeps_new_rows_at_the_boundary(engine):
+    df, last, seen = read_incremental(engine, "sales", "day")
+    assert len(df) == ROWS + 1
+    assert last == dt.date(2024, 3, 30)
+    # Baris baru di tanggal watermark yang sama ikut (>=), baris lama tidak
+    _insert(engine, [{"id": 2000, "day": "2024-03-30"}, {"id": 2001, "day": "2024-03-31"}])
+    new, last, seen = read_incremental(engine, "sales", "day", last, seen)
+    assert sorted(new["id"]) == [2000, 2001]
+    assert last == dt.date(2024, 3, 31)
+    assert read_incremental(engine, "sales", "day", last, seen)[0] is None
+    _insert(engine, [{"id": 2002, "day": "2024-03-31"}])
+    new, _, seen = read_incremental(engine, "sales", "day", last, seen)
+    assert list(new["id"]) == [2002]
+    assert seen == {(2001,), (2002,)}
+
+
+def _loaded(engine, tmp_path):
+    store = DataStore(spill_dir=str(tmp_path / "store"))
+    _, (query,) = table_queries(engine, "sales")
+    df = read_query(engine, query)
+    store["sales"] = df
+    store.meta("sales")["source"] = {"kind": "sql", "dsn": "sqlite://", "table": "sales", "columns": None, "filters": []}
+    watermark, seen = watermark_state(engine, "sales", df, "day")
+    store.meta("sales").update(watermark_col="day", watermark=watermark, watermark_seen=seen)
+    return store, df
+
+
+def test_refresh_is_refused_after_transform(engine, tmp_path):
+    store, df = _loaded(engine, tmp_path)
+    assert store.incremental_state("sales")[:2] == ("day", dt.date(2024, 3, 30))
+    # Filter di pandas: refresh tidak boleh menambah baris mentah yang sudah dibuang
+    store["sales"] = df[df["region"] == "SBY"]
+    assert store.incremental_state("sales") is None
+    assert "watermark" not in store.meta("sales")
+    # Undo ke tabel asli: refresh boleh lagi
+    store.undo("sales")
+    assert store.incremental_state("sales")[0] == "day"
+
+
+def test_refresh_is_refused_after_pushdown(engine, tmp_path):
+    store, df = _loaded(engine, tmp_path)
+    store["sales"] = df[["id", "day"]]
+    store.meta("sales")["source"] = {"kind": "sql", "dsn": "sqlite://", "table": "sales",
+                                     "columns": ["id", "day"], "filters": []}
+    assert store.incremental_state("sales") is None
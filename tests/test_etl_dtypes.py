@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from etl_dtypes import compact_frame
+
+DATA = Path(__file__).resolve().parent.parent / "data_penjualan.csv"
+
+
+def test_iso_dates_keep_their_values():
+    raw = pd.read_csv(DATA)
+    compact, kinds, _ = compact_frame(raw)
+    assert kinds["Date"] == "datetime"
+    assert compact["Date"].dt.strftime("%Y-%m-%d").tolist() == raw["Date"].tolist()
+
+
+def test_non_iso_dates_are_read_day_first():
+    compact, kinds, _ = compact_frame(pd.DataFrame({"d": ["05/01/2024", "13/01/2024"] * 3}))
+    assert kinds["d"] == "datetime"
+    assert compact["d"].iloc[0] == pd.Timestamp(2024, 1, 5)
+
+
+@pytest.mark.parametrize("values", [["05/01/2024", "01/13/2024"], ["2024-01-02", "bukan tanggal"]])
+def test_ambiguous_or_partial_dates_stay_text(values):
+    compact, kinds, _ = compact_frame(pd.DataFrame({"d": values * 3}))
+    assert kinds.get("d") != "datetime"
+    assert compact["d"].astype(object).tolist() == values * 3
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from etl_dtypes import ARROW_STRING
+from etl_store import DataStore
+from etl_transform import (PANDAS_MAX_MB, bulk_replace_pandas, bulk_replace_spark, choose_engine,
+                           choose_join_strategy, column_kinds, dedup_pandas, dedup_spark, DUP_COUNT_COL,
+                           fill_blank_pandas, fill_blank_spark,
+                           filter_contains_pandas, filter_contains_spark, merge_columns_pandas,
+                           merge_columns_spark, replace_pandas, replace_spark, schema_kinds, split_pandas,
+                           split_spark, union_to_parquet)
+
+
+@pytest.fixture
+def sales():
+    return pd.DataFrame({
+        "Region": ["Jakarta", "jakarta", None, "Surabaya", "Jakarta", "Bandung-Barat"],
+        "Product": ["A-1", "B-2", "C", None, "A-1", "D-4"],
+        "Qty": [1, 2, 3, 4, 1, 6],
+        "Price": [1.5, np.nan, 3.0, 4.5, 1.5, 6.0],
+    })
+
+
+# --- pemilihan engine ---
+def test_schema_kinds_match_column_kinds(sales, tmp_path):
+    path = tmp_path / "sales.parquet"
+    sales.to_parquet(path)
+    from_file = schema_kinds(pq.read_schema(path))
+    assert from_file == column_kinds(pd.read_parquet(path))
+
+
+def test_small_data_on_disk_uses_pandas(sales):
+    kinds = schema_kinds(pa.Schema.from_pandas(sales))
+    assert choose_engine("replace", kinds, 10 * 1024, ["Region"]) == "pandas"
+    assert choose_engine("fill", kinds, 10 * 1024) == "pandas"
+
+
+def test_large_data_uses_spark(sales):
+    kinds = column_kinds(sales)
+    assert choose_engine("fill", kinds, (PANDAS_MAX_MB + 1) * 1024 ** 2) == "spark"
+
+
+def test_lazy_plan_and_fixed_ops():
+    assert choose_engine("fill", None, 0) == "spark"
+    assert choose_engine("transpose", None, None) == "pandas"
+    assert choose_engine("cast", {"a": "int"}, 10) == "spark"
+
+
+def test_mixed_or_non_text_columns_use_spark(sales):
+    kinds = column_kinds(sales)
+    assert choose_engine("replace", kinds, 1024, ["Qty"]) == "spark"
+    mixed = pd.DataFrame({"a": ["x", 1, 2.5]})
+    assert choose_engine("fill", column_kinds(mixed), 1024) == "spark"
+
+
+def test_outer_joins_never_broadcast():
+    small = 1024
+    assert choose_join_strategy(None, small, False, "left") == "broadcast"
+    assert choose_join_strategy(None, small, False, "inner") == "broadcast"
+    assert choose_join_strategy(None, small, False, "right") == "shuffle"
+    assert choose_join_strategy(None, small, False, "outer") == "shuffle"
+    assert choose_join_strategy(small, small, True, "outer") == "pandas-hash"
+
+
+# --- union ---
+def test_union_reads_arrow_spill_without_pandas_and_ignores_string_width(sales, tmp_path):
+    store = DataStore(budget_mb=0, spill_dir=str(tmp_path))
+    store["jan"] = sales.set_index("Qty", drop=False)
+    store["other"] = sales  # budget 0: "jan" di-spill ke Arrow IPC
+    spilled = store.arrow_dataset("jan")
+    assert spilled is not None
+    # Kolom string[pyarrow] (mode compact) = large_string di Arrow; bukan penyesuaian tipe
+    feb = sales.astype({"Region": ARROW_STRING, "Product": ARROW_STRING})
+    rows, casts, _ = union_to_parquet([spilled, feb], str(tmp_path / "union"))
+    assert rows == 2 * len(sales)
+    assert casts == []
+    result = pd.read_parquet(tmp_path / "union")
+    assert list(result.columns) == list(sales.columns)
+    assert result["Region"].tolist()[:len(sales)] == sales["Region"].tolist()
+
+
+# --- hasil pandas == hasil Spark ---
+@pytest.fixture(scope="module")
+def spark():
+    pytest.importorskip("pyspark")
+    from pyspark.sql import SparkSession
+    try:
+        session = (SparkSession.builder.master("local[1]").appName("etl-test")
+                   .config("spark.ui.enabled", "false").getOrCreate())
+    except Exception as e:  # JVM / Java tidak tersedia
+        pytest.skip(f"Spark tidak bisa dijalankan: {e}")
+    yield session
+    session.stop()
+
+
+def _same(pandas_result, spark_result):
+    # Urutan baris Spark tidak dijamin (dedup lewat Window): dibandingkan urut Qty
+    got = spark_result.toPandas().sort_values("Qty", kind="stable").reset_index(drop=True)
+    expected = pandas_result.sort_values("Qty", kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(expected.astype(object).where(expected.notna(), None),
+                                  got[list(expected.columns)].astype(object).where(got.notna(), None),
+                                  check_dtype=False)
+
+
+@pytest.mark.parametrize("name, run_pandas, run_spark", [
+    ("fill", lambda df: fill_blank_pandas(df, "Kosong"), lambda sdf: fill_blank_spark(sdf, "Kosong")),
+    ("fill_per_column", lambda df: fill_blank_pandas(df, "-", per_column={"Price": "9"}),
+     lambda sdf: fill_blank_spark(sdf, "-", {"Price": "9"})),
+    ("replace", lambda df: replace_pandas(df, "Region", "Jakarta", "JKT"),
+     lambda sdf: replace_spark(sdf, "Region", "Jakarta", "JKT")),
+    ("bulk_replace", lambda df: bulk_replace_pandas(df, ["Region"], {"jakarta": "Jakarta"}, [("-.*$", "")]),
+     lambda sdf: bulk_replace_spark(sdf, ["Region"], {"jakarta": "Jakarta"}, [("-.*$", "")])),
+    ("filter", lambda df: filter_contains_pandas(df, "Region", "Jak"),
+     lambda sdf: filter_contains_spark(sdf, "Region", "Jak")),
+    ("split", lambda df: split_pandas(df, "Product", "-"), lambda sdf: split_spark(sdf, "Product", "-")),
+    ("merge", lambda df: merge_columns_pandas(df, ["Region", "Product"], " / ", "Label"),
+     lambda sdf: merge_columns_spark(sdf, ["Region", "Product"], " / ", "Label")),
+    ("dedup", lambda df: dedup_pandas(df)[0], lambda sdf: dedup_spark(sdf).drop(DUP_COUNT_COL)),
+])
+def test_pandas_and_spark_give_same_result(spark, sales, name, run_pandas, run_spark):
+    _same(run_pandas(sales.copy()), run_spark(spark.createDataFrame(sales)))
+
+
+
+# Mode compact: kolom teks jadi string[pyarrow] / category; null tidak boleh ikut diganti
+@pytest.mark.parametrize("dtype", [object, "string[pyarrow]", "category"])
+def test_replace_keeps_null_on_compact_dtypes(sales, dtype):
+    compact = sales.astype({"Region": dtype})
+    result = replace_pandas(compact, "Region", "Jakarta", "JKT")["Region"]
+    assert result.isna().tolist() == sales["Region"].isna().tolist()
+    assert result.astype(object).where(result.notna(), None).tolist() == \
+        ["JKT", "jakarta", None, "Surabaya", "JKT", "Bandung-Barat"]
+
+
+@pytest.mark.parametrize("dtype", ["string[pyarrow]", "category"])
+def test_replace_parity_on_compact_dtypes(spark, sales, dtype):
+    compact = sales.astype({"Region": dtype})
+    _same(replace_pandas(compact, "Region", "Jakarta", "JKT"),
+          replace_spark(spark.createDataFrame(sales), "Region", "Jakarta", "JKT"))